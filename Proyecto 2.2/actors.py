@@ -1,8 +1,9 @@
 import pygame
 from world import TILE
+from pathfinding import as_path
+from profiler import PROFILER
 import random
 from collections import deque
-import os
 
 # tiempos
 WORK_TIMES = {
@@ -50,29 +51,6 @@ class DwarfBase:
     walk_imgs = []
     dead_img = None
 
-    @classmethod
-    def load_images(cls):
-        base_path = os.path.dirname(__file__)
-        sprites_path = os.path.join(base_path, "sprites")
-
-        idle = os.path.join(sprites_path, "dwarf_idle.png")
-        w1   = os.path.join(sprites_path, "dwarf_walk1.png")
-        w2   = os.path.join(sprites_path, "dwarf_walk2.png")
-        dead = os.path.join(sprites_path, "dwarf_dead.png")
-
-        cls.idle_img = pygame.image.load(idle).convert_alpha()
-        w1img = pygame.image.load(w1).convert_alpha()
-        w2img = pygame.image.load(w2).convert_alpha()
-        deadimg = pygame.image.load(dead).convert_alpha()
-
-        factor = 2
-        cls.idle_img = pygame.transform.scale(cls.idle_img, (int(TILE*factor), int(TILE*factor)))
-        cls.walk_imgs = [
-            pygame.transform.scale(w1img, (int(TILE*factor), int(TILE*factor))),
-            pygame.transform.scale(w2img, (int(TILE*factor), int(TILE*factor))),
-        ]
-        cls.dead_img = pygame.transform.scale(deadimg, (int(TILE*factor), int(TILE*factor)))
-
     def __init__(self, x, y):
         self.name   = f"{random.choice(DWARF_NAMES)} {random.choice(DWARF_LASTNAMES)}"
         self.oficio = random.choice(OFFICES)
@@ -90,6 +68,12 @@ class DwarfBase:
         self.order_priority = 0
         self.meta = {}
         self.manual_hold = False 
+        # aviso (fn(dwarf)) cuando cambia tarea/estado; lo pone el planner
+        self.on_state_change = None
+
+    def _changed(self):
+        if self.on_state_change is not None:
+            self.on_state_change(self)
 
     def current_work_time(self):
         base = WORK_TIMES.get(self.task, 12)
@@ -104,11 +88,12 @@ class DwarfBase:
             return
         if priority >= self.order_priority:
             self.task = task
-            self.path = deque(path)
+            self.path = as_path(path)
             self.state = "Yendo" if path else "Trabajando"
             self.timer = 0
             self.order_priority = priority
             self.meta = meta or {}
+            self._changed()
 
     def cancel_task(self):
         self.task = "idle"
@@ -117,6 +102,7 @@ class DwarfBase:
         self.timer = 0
         self.order_priority = 0
         self.meta = {}
+        self._changed()
         # manual
 
     def move(self):
@@ -153,6 +139,7 @@ class DwarfBase:
                 self.order_priority = 0
                 # manual_hold no se toca
                 self.meta = {}
+                self._changed()
 
     def defend(self):
         self.state = "Defendiendo"
@@ -177,26 +164,13 @@ class DwarfBase:
         self.order_priority = -1
         self.meta = {}
         # manual no importa
+        self._changed()
 
 
 class PonchoRojo:
     idle_img = None
     walk_imgs = []
 
-    @classmethod
-    def load_images(cls):
-        base_path = os.path.dirname(__file__)
-        sprites_path = os.path.join(base_path, "sprites")
-        idle = os.path.join(sprites_path, "poncho_idle.png")
-        w1 = os.path.join(sprites_path, "poncho_walk1.png")
-        w2 = os.path.join(sprites_path, "poncho_walk2.png")
-
-        cls.idle_img = pygame.image.load(idle).convert_alpha()
-        cls.walk_imgs = [pygame.image.load(w1).convert_alpha(), pygame.image.load(w2).convert_alpha()]
-
-        factor = 1.8
-        cls.idle_img = pygame.transform.scale(cls.idle_img, (int(TILE*factor), int(TILE*factor)))
-        cls.walk_imgs = [pygame.transform.scale(i, (int(TILE*factor), int(TILE*factor))) for i in cls.walk_imgs]
     def __init__(self, x, y, world_map=None, hp=500):
         # posición en grid
         self.x = float(x)
@@ -212,8 +186,26 @@ class PonchoRojo:
         self.map = world_map
         self.path = deque()
         self.repath_cd = 0
-
-    def _pick_target(self, dwarves):
+        # camino actual sale del campo compartido (no de A* propio)
+        self.on_flow = False
+        self.flow_version = -1
+
+    def _cell(self):
+        return (int(round(self.x)), int(round(self.y)))
+
+    def _pick_target(self, dwarves, flow=None, near=None):
+        # con campo: el enano mas cercano por camino (el que marca el gradiente)
+        if flow is not None:
+            self.flow_version = flow.version
+            d = flow.owner_at(*self._cell())
+            if d is not None and d.state != "Muerto":
+                self.target = d
+                return
+        # indice espacial de enanos: anillos de baldes en vez de toda la lista
+        if near is not None:
+            cx, cy = int(self.x), int(self.y)
+            self.target = near.nearest(cx, cy, lambda d: d.state != "Muerto")
+            return
         vivos = [d for d in dwarves if d.state != "Muerto"]
         if not vivos:
             self.target = None
@@ -226,15 +218,20 @@ class PonchoRojo:
     def _repath(self):
         if not self.map or not self.target:
             return
-        start = (int(round(self.x)), int(round(self.y)))
+        start = self._cell()
         goal  = (int(self.target.x), int(self.target.y))
         path = self.map.astar(start, goal)
         if path:
-            self.path = deque(path)
+            self.path = as_path(path)
         else:
             self.path = deque()
 
-    def _step_along_path(self):
+    def _step_along_path(self, flow=None):
+        # siguiendo el campo: un paso por vez, bajando el gradiente
+        if not self.path and flow is not None:
+            step = flow.next_step(*self._cell())
+            if step:
+                self.path = deque([step])
         if not self.path:
             self.state = "Idle"
             return
@@ -267,7 +264,7 @@ class PonchoRojo:
         if target.energy <= 0 and target.state != "Muerto":
             target.die()
 
-    def update(self, dwarves, world_map):
+    def update(self, dwarves, world_map, flow=None, near=None):
         # asegurar referencia al mapa
         if not self.map:
             self.map = world_map
@@ -276,9 +273,10 @@ class PonchoRojo:
         if self.hp <= 0:
             return
 
-        # elegir enano para atacar
-        if (not self.target) or (self.target.state == "Muerto"):
-            self._pick_target(dwarves)
+        # elegir enano para atacar (de nuevo si el campo se rehizo)
+        if (not self.target) or (self.target.state == "Muerto") or \
+                (flow is not None and flow.version != self.flow_version):
+            self._pick_target(dwarves, flow, near)
 
         if self.target:
             tx = int(self.target.x)
@@ -291,13 +289,22 @@ class PonchoRojo:
                 self.state = "Attack"
                 return
 
-            # acercar
-            self.repath_cd -= 1
-            if self.repath_cd <= 0 or not self.path:
-                self._repath()
-                self.repath_cd = 30
-
-            self._step_along_path()
+            # acercar: por el campo compartido; A* propio solo si el campo no llega
+            if flow is not None and flow.next_step(*self._cell()) is not None:
+                if not self.on_flow:
+                    self.path = deque()
+                    self.on_flow = True
+            else:
+                if self.on_flow:
+                    self.path = deque()
+                    self.on_flow = False
+                self.repath_cd -= 1
+                if self.repath_cd <= 0 or not self.path:
+                    PROFILER.count("poncho.repath")
+                    self._repath()
+                    self.repath_cd = 30
+
+            self._step_along_path(flow if self.on_flow else None)
         else:
             self.state = "Idle"
 
@@ -312,7 +319,7 @@ class PonchoJefe(PonchoRojo):
         self.anim_timer = random.randint(0, 15) 
         self.frame_idx = 0
 
-    def update(self, dwarves, world_map):
+    def update(self, dwarves, world_map, flow=None, near=None):
         #anum jefe
         self.anim_timer += 1
         if self.anim_timer >= 15: #vel anim
@@ -320,35 +327,12 @@ class PonchoJefe(PonchoRojo):
             self.anim_timer = 0
         
         # update
-        super().update(dwarves, world_map)
+        super().update(dwarves, world_map, flow, near)
 
 class Llama:
     idle_img = None
     walk_imgs = []
 
-    @classmethod
-    def load_images(cls):
-        try:
-            base_path = os.path.dirname(__file__)
-            sprites_path = os.path.join(base_path, "sprites")
-            idle = os.path.join(sprites_path, "llama_idle.png")
-            w1   = os.path.join(sprites_path, "llama_walk1.png")
-            w2   = os.path.join(sprites_path, "llama_walk2.png")
-
-            cls.idle_img = pygame.image.load(idle).convert_alpha()
-            cls.walk_imgs = [pygame.image.load(w1).convert_alpha(), pygame.image.load(w2).convert_alpha()]
-
-            factor = 1.6
-            cls.idle_img = pygame.transform.scale(cls.idle_img, (int(TILE*factor), int(TILE*factor)))
-            cls.walk_imgs = [pygame.transform.scale(i, (int(TILE*factor), int(TILE*factor))) for i in cls.walk_imgs]
-        except Exception as e:
-            print(f"Warning: No se pudieron cargar los sprites de Llama: {e}")
-            # --- FALLBACK MEJORADO ---
-            fallback_img = pygame.Surface((int(TILE*1.4), int(TILE*1.4)), pygame.SRCALPHA)
-            fallback_img.fill((220, 220, 200))
-            cls.idle_img = fallback_img
-            cls.walk_imgs = [fallback_img, fallback_img]
-
     def __init__(self, x, y, world_map):
         self.x, self.y = float(x), float(y) # mov suave
         self.sx, self.sy = x * TILE, y * TILE
@@ -378,7 +362,7 @@ class Llama:
                     break
             path = self.map.astar((int(self.x), int(self.y)), (tx, ty))
             if path:
-                self.path = deque(path)
+                self.path = as_path(path)
                 self.state = "Walk"
 
         elif self.state == "Walk":
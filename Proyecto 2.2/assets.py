@@ -0,0 +1,165 @@
+# todos los sprites en un solo atlas de cuadros ya escalados a TILE
+# el atlas se guarda en disco (CACHE_DIR) con clave = hash de los PNG + TILE,
+# asi el arranque siguiente no decodifica ni escala nada; cada sprite es una subsuperficie
+#   load_assets()           carga (o arma) el atlas y reparte los sprites a world y actors
+#   AssetManager(tile=32)   mismo proceso para otro tamaño de tile (zoom)
+import os, json, hashlib
+import pygame
+import world
+from world import TILE
+from actors import DwarfBase, PonchoRojo, Llama
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+SPRITES_DIR = os.path.join(BASE_DIR, "sprites")
+CACHE_DIR = os.path.join(BASE_DIR, ".sprite_cache")
+# sube si cambia el armado del atlas (invalida lo guardado)
+ATLAS_VERSION = 1
+ATLAS_WIDTH = 512
+PAD = 1
+
+# nombre: (archivo, tamaño en tiles, obligatorio)
+SPRITES = {
+    "dwarf_idle":   ("dwarf_idle.png", 2, True),
+    "dwarf_walk1":  ("dwarf_walk1.png", 2, True),
+    "dwarf_walk2":  ("dwarf_walk2.png", 2, True),
+    "dwarf_dead":   ("dwarf_dead.png", 2, True),
+    "poncho_idle":  ("poncho_idle.png", 1.8, True),
+    "poncho_walk1": ("poncho_walk1.png", 1.8, True),
+    "poncho_walk2": ("poncho_walk2.png", 1.8, True),
+    "llama_idle":   ("llama_idle.png", 1.6, False),
+    "llama_walk1":  ("llama_walk1.png", 1.6, False),
+    "llama_walk2":  ("llama_walk2.png", 1.6, False),
+    "boss1":        ("boss1.png", 2.2, False),
+    "boss2":        ("boss2.png", 2.2, False),
+    "tree":         ("tree.png", 1.3, False),
+    "mine":         ("mineral.png", 1.6, False),
+    "tower":        ("cholet.png", 4, False),
+    "hospital":     ("cholet2.png", 4, False),
+    "wall":         ("wall.png", 1.6, False),
+}
+
+
+class AssetManager:
+    def __init__(self, tile=TILE, sprites=SPRITES, sprites_dir=SPRITES_DIR, cache_dir=CACHE_DIR):
+        self.tile = tile
+        self.sprites = sprites
+        self.sprites_dir = sprites_dir
+        self.cache_dir = cache_dir
+        self.atlas = None
+        self.frames = {}
+        self.missing = []
+        # "cache" si salio del disco, "built" si se armo de los PNG
+        self.source = None
+
+    def get(self, name):
+        return self.frames.get(name)
+
+    def _key(self, present):
+        h = hashlib.sha1(f"v{ATLAS_VERSION} tile={self.tile}".encode())
+        for name in sorted(present):
+            fname, factor, _ = self.sprites[name]
+            h.update(f"{name}:{factor}:".encode())
+            with open(os.path.join(self.sprites_dir, fname), "rb") as f:
+                h.update(hashlib.sha1(f.read()).digest())
+        return h.hexdigest()[:16]
+
+    def load(self):
+        present = []
+        self.missing = []
+        for name, (fname, _, required) in self.sprites.items():
+            if os.path.exists(os.path.join(self.sprites_dir, fname)):
+                present.append(name)
+            elif required:
+                raise FileNotFoundError(os.path.join(self.sprites_dir, fname))
+            else:
+                self.missing.append(name)
+        key = self._key(present)
+        png = os.path.join(self.cache_dir, f"atlas_{key}.png")
+        meta = os.path.join(self.cache_dir, f"atlas_{key}.json")
+        if os.path.exists(png) and os.path.exists(meta):
+            with open(meta) as f:
+                rects = json.load(f)
+            atlas = pygame.image.load(png)
+            self.source = "cache"
+        else:
+            atlas, rects = self._build(present)
+            self._save(atlas, rects, png, meta)
+            self.source = "built"
+        if pygame.display.get_surface() is not None:
+            atlas = atlas.convert_alpha()
+        self.atlas = atlas
+        self.frames = {name: atlas.subsurface(pygame.Rect(r)) for name, r in rects.items()}
+        return self
+
+    def _build(self, present):
+        # escalar cada PNG y acomodarlos en estantes (mas altos primero)
+        scaled = {}
+        for name in present:
+            fname, factor, _ = self.sprites[name]
+            img = pygame.image.load(os.path.join(self.sprites_dir, fname))
+            side = int(self.tile * factor)
+            scaled[name] = pygame.transform.scale(img, (side, side))
+        order = sorted(scaled, key=lambda n: -scaled[n].get_height())
+        width = max([ATLAS_WIDTH] + [s.get_width() + 2*PAD for s in scaled.values()])
+        rects = {}
+        x = y = shelf_h = 0
+        for name in order:
+            w, h = scaled[name].get_size()
+            if x + w + PAD > width:
+                x, y, shelf_h = 0, y + shelf_h, 0
+            rects[name] = (x + PAD, y + PAD, w, h)
+            x += w + 2*PAD
+            shelf_h = max(shelf_h, h + 2*PAD)
+        atlas = pygame.Surface((width, max(1, y + shelf_h)), pygame.SRCALPHA)
+        for name, r in rects.items():
+            atlas.blit(scaled[name], r[:2])
+        return atlas, rects
+
+    def _save(self, atlas, rects, png, meta):
+        # sin permiso de escritura: se arma de nuevo la proxima vez
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            pygame.image.save(atlas, png)
+            with open(meta, "w") as f:
+                json.dump(rects, f)
+        except OSError as e:
+            print(f"Warning: no se pudo guardar el atlas en {self.cache_dir}: {e}")
+
+
+ASSETS = None
+
+
+def load_assets(tile=TILE):
+    # una sola vez por tamaño de tile; reparte los sprites donde se dibujan
+    global ASSETS
+    if ASSETS is not None and ASSETS.tile == tile:
+        return ASSETS
+    ASSETS = a = AssetManager(tile).load()
+    get = a.get
+
+    DwarfBase.idle_img = get("dwarf_idle")
+    DwarfBase.walk_imgs = [get("dwarf_walk1"), get("dwarf_walk2")]
+    DwarfBase.dead_img = get("dwarf_dead")
+
+    PonchoRojo.idle_img = get("poncho_idle")
+    PonchoRojo.walk_imgs = [get("poncho_walk1"), get("poncho_walk2")]
+
+    if get("llama_idle") and get("llama_walk1") and get("llama_walk2"):
+        Llama.idle_img = get("llama_idle")
+        Llama.walk_imgs = [get("llama_walk1"), get("llama_walk2")]
+    else:
+        print("Warning: No se pudieron cargar los sprites de Llama")
+        fallback_img = pygame.Surface((int(tile*1.4), int(tile*1.4)), pygame.SRCALPHA)
+        fallback_img.fill((220, 220, 200))
+        Llama.idle_img = fallback_img
+        Llama.walk_imgs = [fallback_img, fallback_img]
+
+    world.TREE_IMG = get("tree")
+    world.MINE_IMG = get("mine")
+    world.TOWER_IMG = get("tower")
+    world.HOSPITAL_IMG = get("hospital")
+    world.WALL_IMG = get("wall")
+    world.BOSS_IMGS = [img for img in (get("boss1"), get("boss2")) if img is not None]
+    if world.WALL_IMG is None:
+        print("Warning: wall.png sprite not found.")
+    return a
@@ -0,0 +1,81 @@
+# compara el A* viejo (dicts + tuplas) contra MapGrid.astar (GridAStar) en el mapa 200x150
+#   python benchmarks/bench_astar.py [--seed N] [--pairs N]
+import os, sys, time, random, heapq, argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from world import MapGrid, MAP_W, MAP_H
+
+
+def legacy_astar(m, start, goal):
+    # copia del MapGrid.astar original
+    if not goal or start == goal:
+        return []
+    sx,sy = start; gx,gy = goal
+    if not m.in_bounds(gx,gy):
+        return []
+    openh=[]; heapq.heappush(openh,(0,start))
+    came={start:None}; g={start:0}
+    while openh:
+        _,cur = heapq.heappop(openh)
+        if cur==goal: break
+        for nx,ny in m.neighbors(*cur):
+            ng=g[cur]+1
+            if (nx,ny) not in g or ng<g[(nx,ny)]:
+                g[(nx,ny)]=ng
+                f=ng+abs(nx-gx)+abs(ny-gy)
+                heapq.heappush(openh,(f,(nx,ny)))
+                came[(nx,ny)]=cur
+    if goal not in came:
+        return []
+    path=[]; cur=goal
+    while cur and cur!=start:
+        path.append(cur); cur=came[cur]
+    path.reverse()
+    return path
+
+
+def random_pairs(m, n, rng):
+    cells = [(x, y) for y in range(m.h) for x in range(m.w) if m.passable[y*m.w + x]]
+    return [(rng.choice(cells), rng.choice(cells)) for _ in range(n)]
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--seed", type=int, default=7)
+    ap.add_argument("--pairs", type=int, default=200)
+    args = ap.parse_args()
+
+    random.seed(args.seed)
+    m = MapGrid(MAP_W, MAP_H)
+    pairs = random_pairs(m, args.pairs, random.Random(args.seed))
+
+    t0 = time.perf_counter()
+    old = [legacy_astar(m, a, b) for a, b in pairs]
+    t_old = time.perf_counter() - t0
+
+    m.pathfinder.expanded = 0
+    t0 = time.perf_counter()
+    new = [m.astar(a, b) for a, b in pairs]
+    t_new = time.perf_counter() - t0
+
+    # misma tanda otra vez: sale del cache de caminos
+    t0 = time.perf_counter()
+    for a, b in pairs:
+        m.astar(a, b)
+    t_hot = time.perf_counter() - t0
+
+    bad = sum(1 for a, b in zip(old, new) if len(a) != len(b))
+    same = sum(1 for a, b in zip(old, new) if a == b)
+    found = sum(1 for p in old if p)
+    print(f"mapa {m.w}x{m.h} seed={args.seed} pares={len(pairs)} con camino={found}")
+    print(f"  legacy astar : {t_old*1000:9.1f} ms  ({t_old/len(pairs)*1000:.2f} ms/consulta)")
+    print(f"  MapGrid.astar: {t_new*1000:9.1f} ms  ({t_new/len(pairs)*1000:.2f} ms/consulta)"
+          f"  nodos expandidos={m.pathfinder.expanded}")
+    print(f"  con cache    : {t_hot*1000:9.1f} ms  {m.path_cache.stats()}")
+    print(f"  speedup x{t_old/max(t_new, 1e-9):.1f}  largos distintos={bad}  caminos identicos={same}")
+    if bad:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
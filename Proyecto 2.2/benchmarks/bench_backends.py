@@ -0,0 +1,72 @@
+# compara los motores de pathfinding (pathfinding.PATHFINDERS) en mapas generados
+# chequea que todos den caminos del mismo largo que A* y mide nodos/tiempo por consulta
+#   python benchmarks/bench_backends.py [--seeds 1 2 3] [--size 200x150] [--pairs N]
+import os, sys, time, random, argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from world import MapGrid, MAP_W, MAP_H
+from pathfinding import PATHFINDERS
+
+
+def reachable_pairs(m, n, rng):
+    cells = [(x, y) for y in range(m.h) for x in range(m.w) if m.passable[y*m.w + x]]
+    pairs = []
+    while len(pairs) < n:
+        a, b = rng.choice(cells), rng.choice(cells)
+        if a != b and m.reachable(a, b):
+            pairs.append((a, b))
+    return pairs
+
+
+def valid(m, start, goal, path):
+    # pasos de a uno, sobre celdas pasables, terminando en goal
+    cur = start
+    for x, y in path:
+        if abs(x-cur[0]) + abs(y-cur[1]) != 1 or not m.passable[y*m.w + x]:
+            return False
+        cur = (x, y)
+    return cur == goal
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--seeds", type=int, nargs="+", default=[1, 2, 3])
+    ap.add_argument("--size", default=f"{MAP_W}x{MAP_H}")
+    ap.add_argument("--pairs", type=int, default=200)
+    args = ap.parse_args()
+    w, h = (int(v) for v in args.size.split("x"))
+
+    totals = {name: [0, 0.0] for name in PATHFINDERS}
+    bad = 0
+    for seed in args.seeds:
+        random.seed(seed)
+        m = MapGrid(w, h, hpa=False)
+        pairs = reachable_pairs(m, args.pairs, random.Random(seed))
+        ref = None
+        print(f"mapa {w}x{h} seed={seed} pares={len(pairs)}")
+        for name, cls in PATHFINDERS.items():
+            pf = cls(m)
+            t0 = time.perf_counter()
+            paths = [pf.search(a, b) for a, b in pairs]
+            dt = time.perf_counter() - t0
+            lens = [len(p) for p in paths]
+            if ref is None:
+                ref = lens
+            wrong = sum(1 for l, r in zip(lens, ref) if l != r)
+            wrong += sum(1 for (a, b), p in zip(pairs, paths) if not valid(m, a, b, p))
+            bad += wrong
+            totals[name][0] += pf.expanded
+            totals[name][1] += dt
+            print(f"  {name:6s}: {dt/len(pairs)*1000:7.3f} ms/consulta"
+                  f"  nodos/consulta={pf.expanded/len(pairs):8.1f}  distintos={wrong}")
+
+    q = args.pairs * len(args.seeds)
+    print("total")
+    for name, (nodes, dt) in totals.items():
+        print(f"  {name:6s}: {dt/q*1000:7.3f} ms/consulta  nodos/consulta={nodes/q:8.1f}")
+    if bad:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
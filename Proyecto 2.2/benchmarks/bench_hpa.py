@@ -0,0 +1,58 @@
+# HPA* contra A* plano en viajes largos sobre un mapa grande
+#   python benchmarks/bench_hpa.py [--size 1000] [--seed N] [--pairs N]
+import os, sys, time, random, argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from world import MapGrid, HPA_MIN_DIST, manhattan
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--size", type=int, default=1000)
+    ap.add_argument("--seed", type=int, default=7)
+    ap.add_argument("--pairs", type=int, default=20)
+    args = ap.parse_args()
+
+    random.seed(args.seed)
+    t0 = time.perf_counter()
+    m = MapGrid(args.size, args.size, hpa=True)
+    print(f"mapa {m.w}x{m.h} generado en {time.perf_counter()-t0:.1f} s")
+
+    rng = random.Random(args.seed)
+    cells = [(x, y) for y in range(m.h) for x in range(m.w) if m.passable[y*m.w + x]]
+    pairs = [(m.home, m.granary)]
+    while len(pairs) < args.pairs:
+        a, b = rng.choice(cells), rng.choice(cells)
+        if manhattan(a, b) >= HPA_MIN_DIST and m.reachable(a, b):
+            pairs.append((a, b))
+
+    for label in ("frio", "caliente"):
+        t0 = time.perf_counter()
+        lazy = []
+        for a, b in pairs:
+            p = m.hpa.find_path(a, b)
+            if p:
+                p[0]  # solo el primer tramo
+            lazy.append(p)
+        t_first = time.perf_counter() - t0
+        print(f"  HPA* {label:8}: {t_first*1000:8.1f} ms hasta el primer paso "
+              f"({t_first/len(pairs)*1000:.2f} ms/consulta)")
+
+    t0 = time.perf_counter()
+    full = [list(p) if p else [] for p in lazy]
+    t_refine = time.perf_counter() - t0
+    print(f"  refinar todo   : {t_refine*1000:8.1f} ms")
+
+    t0 = time.perf_counter()
+    flat = [m.pathfinder.search(a, b) for a, b in pairs]
+    t_flat = time.perf_counter() - t0
+    print(f"  A* plano       : {t_flat*1000:8.1f} ms ({t_flat/len(pairs)*1000:.2f} ms/consulta)")
+
+    ratios = [len(h) / len(f) for h, f in zip(full, flat) if f]
+    if ratios:
+        print(f"  largo HPA*/optimo: medio {sum(ratios)/len(ratios):.3f}  peor {max(ratios):.3f}")
+    print(f"  nodos abstractos expandidos: {m.hpa.expanded}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+# tiempo de generacion del mapa: generador NumPy contra el de Python puro
+# (solo la generacion: grid, resource_amount, idx y passable)
+#   python benchmarks/bench_mapgen.py [--seed N] [--sizes 200x150 1000x1000 ...] [--legacy-max AREA]
+import os, sys, time, argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import world
+from world import MapGrid, FOREST, MINE, FARM, WATER, HOSPITAL
+
+
+def generate(w, h, seed, numpy=True):
+    # MapGrid sin campos, regiones ni pathfinding: solo _generate
+    m = MapGrid.__new__(MapGrid)
+    m.w, m.h = w, h
+    m.resource_amount = {}
+    m.idx = {FOREST: set(), MINE: set(), FARM: set(), HOSPITAL: set()}
+    saved = world.np
+    if not numpy:
+        world.np = None
+    try:
+        t0 = time.perf_counter()
+        m._generate(seed)
+        dt = time.perf_counter() - t0
+    finally:
+        world.np = saved
+    return m, dt
+
+
+def share(m):
+    # fraccion del area por tipo (para ver que las reglas den lo mismo)
+    n = m.w * m.h
+    counts = {k: 0 for k in (FOREST, MINE, FARM, WATER)}
+    for row in m.grid:
+        for k in counts:
+            counts[k] += row.count(k)
+    return " ".join(f"{name}={counts[k]/n:.3f}" for name, k in
+                    (("bosque", FOREST), ("mina", MINE), ("granja", FARM), ("agua", WATER)))
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--seed", type=int, default=7)
+    ap.add_argument("--sizes", nargs="+", default=["200x150", "500x500", "1000x1000", "2000x2000"])
+    ap.add_argument("--legacy-max", type=int, default=1000*1000,
+                    help="area maxima para correr tambien el generador en Python puro")
+    args = ap.parse_args()
+    if world.np is None:
+        sys.exit("numpy no esta instalado")
+
+    for size in args.sizes:
+        w, h = (int(v) for v in size.split("x"))
+        m, t_np = generate(w, h, args.seed)
+        print(f"{w}x{h}")
+        print(f"  numpy : {t_np*1000:9.1f} ms  {share(m)}")
+        if w*h <= args.legacy_max:
+            m, t_py = generate(w, h, args.seed, numpy=False)
+            print(f"  python: {t_py*1000:9.1f} ms  {share(m)}  speedup x{t_py/max(t_np, 1e-9):.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,209 @@
+# escenarios fijos (semilla fija) para medir el juego completo y comparar corridas
+#   python benchmarks/bench_scenarios.py [--only economia oleada30] [--ticks N] [--no-draw]
+#                                        [--out resultados.json] [--compare viejo.json]
+# sin --out se guarda en benchmarks/results/bench_scenarios.json
+# por escenario: ticks/s, p50/p99 de update y draw (ms), llamadas a astar y
+# nodos expandidos por tick; todo va a un JSON para comparar regresiones
+import os, sys, io, json, time, argparse, contextlib, platform
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from sim import SimCore
+from world import TOWER
+
+# regresion: peor que esto (relativo) en ticks/s o p99 se marca
+TOLERANCE = 0.10
+# salida por defecto (ignorada por git)
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+
+def economia():
+    # comienzo de partida: 4 enanos juntando recursos
+    sim = SimCore(seed=11)
+    for t in ("wood", "mine", "farm", "hunt"):
+        sim.planner.push_action(t, 3)
+    return sim
+
+
+def heap_lleno():
+    # 200 enanos y muchas mas tareas que enanos en el heap
+    sim = SimCore(seed=12, dwarves=200)
+    for t in ("wood", "mine", "farm", "hunt"):
+        sim.planner.push_action(t, 500)
+    return sim
+
+
+def oleada30():
+    # oleada 30: 60 ponchos + jefe contra 20 torres alrededor de la casa
+    sim = SimCore(seed=13, dwarves=20)
+    sim.events.enabled = False
+    hx, hy = sim.map.home
+    placed = 0
+    for r in range(2, 12):
+        for dx in range(-r, r+1, 2):
+            for x, y in ((hx+dx, hy-r), (hx+dx, hy+r)):
+                if placed < 20 and sim.map.is_buildable(x, y):
+                    sim.map.set_tile(x, y, TOWER)
+                    sim.towers.append({"x": x, "y": y, "cd": 0, "militia": 0})
+                    placed += 1
+    sim.events.wave_number = 29
+    sim.events.spawn_wave()
+    return sim
+
+
+def mapa_grande():
+    # 1000x1000 con la economia de arranque
+    sim = SimCore(1000, 1000, seed=14)
+    for t in ("wood", "mine", "farm", "hunt"):
+        sim.planner.push_action(t, 3)
+    return sim
+
+
+# nombre -> (armado, ticks por defecto)
+SCENARIOS = {
+    "economia": (economia, 2000),
+    "heap_lleno": (heap_lleno, 300),
+    "oleada30": (oleada30, 600),
+    "mapa_grande": (mapa_grande, 600),
+}
+
+
+def pct(values, p):
+    if not values:
+        return 0.0
+    s = sorted(values)
+    return s[min(len(s)-1, int(round(p/100 * (len(s)-1))))]
+
+
+def expanded_nodes(m):
+    # nodos expandidos por el motor de pathfinding y el grafo jerarquico
+    return m.pathfinder.expanded + (m.hpa.expanded if m.hpa is not None else 0)
+
+
+_game = None
+
+
+def renderer(sim):
+    # una sola ventana por proceso (SCALED no se puede recrear): se cambia la sim
+    global _game
+    from main import Game
+    if _game is None:
+        _game = Game(sim)
+    else:
+        _game.sim = sim
+        _game.ticks = 0
+        _game.selected_dwarf = None
+        _game.center_camera(*sim.map.home)
+        _game._snap_smooth_positions()
+    _game.paused = False
+    return _game
+
+
+def run(name, ticks, draw):
+    build, default_ticks = SCENARIOS[name]
+    ticks = ticks or default_ticks
+    t0 = time.perf_counter()
+    sim = build()
+    setup = time.perf_counter() - t0
+    game = None
+    if draw:
+        game = renderer(sim)
+    m = sim.map
+    calls0, expanded0 = m.astar_calls, expanded_nodes(m)
+    upd, drw = [], []
+    t_start = time.perf_counter()
+    for _ in range(ticks):
+        a = time.perf_counter()
+        if game is not None:
+            sim.tick()
+            game.ticks += 1
+            b = time.perf_counter()
+            game.draw()
+            drw.append(time.perf_counter() - b)
+            upd.append(b - a)
+        else:
+            sim.tick()
+            upd.append(time.perf_counter() - a)
+    total = time.perf_counter() - t_start
+    expanded = expanded_nodes(m) - expanded0
+    ms = 1000
+    return {
+        "ticks": ticks,
+        "setup_s": round(setup, 3),
+        "ticks_per_s": round(ticks / max(sum(upd), 1e-9), 1),
+        "frames_per_s": round(ticks / max(total, 1e-9), 1),
+        "update_p50_ms": round(pct(upd, 50)*ms, 3),
+        "update_p99_ms": round(pct(upd, 99)*ms, 3),
+        "draw_p50_ms": round(pct(drw, 50)*ms, 3),
+        "draw_p99_ms": round(pct(drw, 99)*ms, 3),
+        "astar_calls_per_tick": round((m.astar_calls - calls0) / ticks, 3),
+        "nodes_expanded_per_tick": round(expanded / ticks, 1),
+        "ponchos_left": len(sim.ponchos),
+        "dwarves_alive": sum(d.state != "Muerto" for d in sim.dwarves),
+    }
+
+
+def compare(old, new):
+    # (escenario, metrica, antes, ahora) que empeoraron mas que TOLERANCE
+    worse = []
+    for name, cur in new["scenarios"].items():
+        prev = old.get("scenarios", {}).get(name)
+        if not prev:
+            continue
+        for key, higher_is_better in (("ticks_per_s", True), ("update_p99_ms", False),
+                                      ("draw_p99_ms", False), ("nodes_expanded_per_tick", False)):
+            a, b = prev.get(key), cur.get(key)
+            if not a or b is None:
+                continue
+            change = (b - a) / a
+            if (change < -TOLERANCE) if higher_is_better else (change > TOLERANCE):
+                worse.append((name, key, a, b))
+    return worse
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--only", nargs="+", choices=list(SCENARIOS), default=list(SCENARIOS))
+    ap.add_argument("--ticks", type=int, default=0, help="ticks por escenario (0 = los de cada uno)")
+    ap.add_argument("--no-draw", action="store_true", help="solo simulacion, sin medir draw")
+    ap.add_argument("--out", default=os.path.join(RESULTS_DIR, "bench_scenarios.json"))
+    ap.add_argument("--compare", help="JSON de una corrida anterior")
+    args = ap.parse_args()
+
+    results = {}
+    for name in args.only:
+        with contextlib.redirect_stdout(io.StringIO()):
+            r = run(name, args.ticks, not args.no_draw)
+        results[name] = r
+        print(f"{name:12s} {r['ticks_per_s']:9.1f} ticks/s"
+              f"  update p50/p99={r['update_p50_ms']:.2f}/{r['update_p99_ms']:.2f} ms"
+              f"  draw p50/p99={r['draw_p50_ms']:.2f}/{r['draw_p99_ms']:.2f} ms"
+              f"  astar/tick={r['astar_calls_per_tick']:.2f}"
+              f"  nodos/tick={r['nodes_expanded_per_tick']:.1f}")
+
+    doc = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "draw": not args.no_draw,
+        "scenarios": results,
+    }
+    os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+    with open(args.out, "w") as f:
+        json.dump(doc, f, indent=2)
+    print(f"resultados en {args.out}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            old = json.load(f)
+        worse = compare(old, doc)
+        for name, key, a, b in worse:
+            print(f"  REGRESION {name}.{key}: {a} -> {b}")
+        if worse:
+            sys.exit(1)
+        print("sin regresiones")
+
+
+if __name__ == "__main__":
+    main()
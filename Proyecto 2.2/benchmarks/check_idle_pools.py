@@ -0,0 +1,77 @@
+# chequeo de los pools de enanos libres del planner contra un recorrido completo
+#   python benchmarks/check_idle_pools.py [--ticks N]
+# con un hospital al lado de la casa (curacion), guardias (energia 150 que baja
+# al tope de 100) y una oleada encima: cada tick el orden de los pools tiene
+# que ser el de mas a menos energia entre los libres, igual que ordenar a todos de nuevo
+import os, sys, io, argparse, contextlib
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from sim import SimCore
+from world import HOSPITAL
+from planner import PRIORITIES, SPECIALISTS
+
+
+def setup():
+    sim = SimCore(seed=21, dwarves=30)
+    hx, hy = sim.map.home
+    for dx in range(2, 12):
+        if sim.map.is_buildable(hx + dx, hy + 2):
+            sim.map.set_tile(hx + dx, hy + 2, HOSPITAL)
+            break
+    # energias distintas: los cercanos al hospital suben mas rapido que el resto
+    for k, d in enumerate(sim.dwarves):
+        if d.oficio != "Guardia":
+            d.energy = 5 + (k * 7) % 60
+    for t in ("wood", "mine", "farm"):
+        sim.planner.push_action(t, 20)
+    sim.events.wave_number = 5
+    sim.events.spawn_wave()
+    return sim
+
+
+def fresh(sim, oficios, hold, exclude):
+    # lo que haria el planner sin pools: recorrer y ordenar a todos
+    out = []
+    for d in sim.dwarves:
+        if d.task != "idle" or d.state == "Muerto" or d.energy <= 0:
+            continue
+        if d.manual_hold and not hold:
+            continue
+        if (d.oficio in oficios) == exclude:
+            continue
+        out.append(d)
+    return sorted((d.energy for d in out), reverse=True)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--ticks", type=int, default=1500)
+    args = ap.parse_args()
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        sim = setup()
+    pools = sim.planner.idle
+    errors = checked = 0
+    for tick in range(args.ticks):
+        with contextlib.redirect_stdout(io.StringIO()):
+            sim.tick()
+        for task in PRIORITIES:
+            oficios = SPECIALISTS.get(task, set())
+            for hold in (False, True):
+                for exclude in (False, True):
+                    want = fresh(sim, oficios, hold, exclude)
+                    got = [d.energy for d in pools.by_energy(oficios, hold, exclude)]
+                    checked += 1
+                    if got != want:
+                        errors += 1
+                        if errors <= 5:
+                            print(f"tick {tick} {task} hold={hold} exclude={exclude}: "
+                                  f"pools={got[:3]} recorrido={want[:3]}")
+    print(f"{checked} comparaciones, {errors} distintas")
+    sys.exit(1 if errors else 0)
+
+
+if __name__ == "__main__":
+    main()
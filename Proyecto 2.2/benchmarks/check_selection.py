@@ -0,0 +1,44 @@
+# chequeo de seleccion con click derecho estando en pausa
+#   python benchmarks/check_selection.py
+# la partida arranca en pausa y ahi update no corre: cada enano (los iniciales y
+# los reclutados con B/N) tiene que poder elegirse clickeando donde se dibuja
+import os, sys, io, contextlib
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import pygame
+from main import Game
+
+
+def press(game, key):
+    pygame.event.post(pygame.event.Event(pygame.KEYDOWN, key=key, mod=0, unicode=""))
+    with contextlib.redirect_stdout(io.StringIO()):
+        game.handle_events()
+
+
+def main():
+    with contextlib.redirect_stdout(io.StringIO()):
+        game = Game()
+    assert game.paused
+    game.sim.resources["food"] = 100
+    press(game, pygame.K_b)
+    press(game, pygame.K_n)
+    # unos frames en pausa: las posiciones suaves llegan a donde se dibuja
+    for _ in range(30):
+        game._smooth_positions()
+
+    errors = 0
+    for d in game.dwarves:
+        got = game.dwarf_at_screenpos(int(d.sx), int(d.sy))
+        # dos enanos en el mismo tile: alcanza con que se elija alguno de ahi
+        if got is None or (got.x, got.y) != (d.x, d.y):
+            errors += 1
+            print(f"enano en {d.x},{d.y} no seleccionable (step {game.sim.step_counter})")
+    print(f"{len(game.dwarves)} enanos, {errors} sin seleccionar")
+    pygame.quit()
+    sys.exit(1 if errors else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,294 @@
+import heapq
+from array import array
+from collections import deque
+from profiler import PROFILER
+
+
+# campo de distancias multi-fuente (BFS) sobre el grid
+# dist[i] = pasos hasta la fuente mas cercana, parent[i] = siguiente paso hacia ella
+class DistanceField:
+    def __init__(self, world_map, sources=()):
+        self.map = world_map
+        self.w, self.h = world_map.w, world_map.h
+        self.sources = {y*self.w + x for (x, y) in sources}
+        self.rebuild()
+
+    def _nbrs(self, i):
+        # mismo orden que MapGrid.neighbors
+        w = self.w
+        x = i % w
+        out = []
+        if x + 1 < w: out.append(i + 1)
+        if x > 0: out.append(i - 1)
+        if i + w < w*self.h: out.append(i + w)
+        if i >= w: out.append(i - w)
+        return out
+
+    def rebuild(self):
+        n = self.w * self.h
+        self.dist = dist = array('i', [-1]) * n
+        self.parent = parent = array('i', [-1]) * n
+        passable = self.map.passable
+        w = self.w
+        q = deque()
+        for s in self.sources:
+            if passable[s]:
+                dist[s] = 0
+                q.append(s)
+        while q:
+            c = q.popleft()
+            nd = dist[c] + 1
+            x = c % w
+            for nb in (c+1 if x+1 < w else -1, c-1 if x > 0 else -1,
+                       c+w if c+w < n else -1, c-w):
+                if nb >= 0 and dist[nb] < 0 and passable[nb]:
+                    dist[nb] = nd
+                    parent[nb] = c
+                    q.append(nb)
+
+    def _propagate(self, heap):
+        # relajar hacia afuera desde semillas (d, i); solo baja distancias
+        dist, parent, passable = self.dist, self.parent, self.map.passable
+        while heap:
+            d, c = heapq.heappop(heap)
+            if d != dist[c]:
+                continue
+            nd = d + 1
+            for nb in self._nbrs(c):
+                if passable[nb] and (dist[nb] < 0 or nd < dist[nb]):
+                    dist[nb] = nd
+                    parent[nb] = c
+                    heapq.heappush(heap, (nd, nb))
+
+    def _best_neighbor(self, i):
+        best, bp = -1, -1
+        for nb in self._nbrs(i):
+            d = self.dist[nb]
+            if d >= 0 and (best < 0 or d < best):
+                best, bp = d, nb
+        return best, bp
+
+    def _invalidate(self, root):
+        # borrar el subarbol que dependia de root y volver a sembrarlo desde el borde
+        dist, parent, passable = self.dist, self.parent, self.map.passable
+        region = [root]
+        dist[root] = -1
+        parent[root] = -1
+        k = 0
+        while k < len(region):
+            c = region[k]; k += 1
+            for nb in self._nbrs(c):
+                if parent[nb] == c:
+                    dist[nb] = -1
+                    parent[nb] = -1
+                    region.append(nb)
+
+        heap = []
+        for c in region:
+            if not passable[c]:
+                continue
+            if c in self.sources:
+                dist[c] = 0
+                heap.append((0, c))
+                continue
+            d, p = self._best_neighbor(c)
+            if d >= 0:
+                dist[c] = d + 1
+                parent[c] = p
+                heap.append((d + 1, c))
+        heapq.heapify(heap)
+        self._propagate(heap)
+
+    def refresh(self, i, was_passable, is_source):
+        # la celda i cambio (paso o fuente); actualiza solo la zona afectada
+        now = self.map.passable[i]
+        if bool(was_passable) == bool(now) and (i in self.sources) == is_source:
+            return
+        if is_source:
+            self.sources.add(i)
+        else:
+            self.sources.discard(i)
+
+        d = self.dist[i]
+        if d >= 0 and (not now or (d == 0 and not is_source)):
+            self._invalidate(i)
+        elif now:
+            if is_source:
+                nd, p = 0, -1
+            else:
+                nd, p = self._best_neighbor(i)
+                if nd >= 0:
+                    nd += 1
+            if nd >= 0 and (d < 0 or nd < d):
+                self.dist[i] = nd
+                self.parent[i] = p
+                self._propagate([(nd, i)])
+
+    def distance(self, x, y):
+        return self.dist[y*self.w + x]
+
+    def path_from(self, start):
+        # baja por el gradiente: (meta, camino) como astar, (None, []) si no llega
+        x, y = start
+        if not (0 <= x < self.w and 0 <= y < self.h):
+            return None, []
+        i = y*self.w + x
+        dist, parent, w = self.dist, self.parent, self.w
+        path = []
+        if dist[i] < 0:
+            # parado en celda bloqueada: salir por el mejor vecino
+            if self.map.passable[i]:
+                return None, []
+            d, nb = self._best_neighbor(i)
+            if d < 0:
+                return None, []
+            i = nb
+            path.append((i % w, i // w))
+        while dist[i] > 0:
+            i = parent[i]
+            path.append((i % w, i // w))
+        return (i % w, i // w), path
+
+
+def reach(world_map, sources, goals, first=False):
+    # BFS multi-fuente de una sola pasada, corta al tocar todas las metas
+    # (o la primera si first; sin metas recorre todo). Las fuentes se siembran aunque esten bloqueadas
+    # y una meta bloqueada se alcanza desde un vecino pero no se atraviesa.
+    # devuelve ({meta: distancia}, parent, origin) como arrays por indice plano;
+    # parent[i] = paso anterior hacia la fuente, origin[i] = fuente de la que viene
+    w, n = world_map.w, world_map.w * world_map.h
+    passable = world_map.passable
+    goals = set(goals)
+    want = len(goals) if goals else -1
+    dist = array('i', [-1]) * n
+    parent = array('i', [-1]) * n
+    origin = array('i', [-1]) * n
+    found = {}
+    q = deque()
+    for s in sources:
+        if dist[s] < 0:
+            dist[s] = 0
+            origin[s] = s
+            q.append(s)
+            if s in goals:
+                found[s] = 0
+    if found and first or len(found) == want:
+        return found, parent, origin
+    while q:
+        c = q.popleft()
+        nd = dist[c] + 1
+        o = origin[c]
+        x = c % w
+        for nb in (c+1 if x+1 < w else -1, c-1 if x > 0 else -1,
+                   c+w if c+w < n else -1, c-w):
+            if nb < 0 or dist[nb] >= 0:
+                continue
+            if passable[nb]:
+                q.append(nb)
+            elif nb not in goals:
+                continue
+            dist[nb] = nd
+            parent[nb] = c
+            origin[nb] = o
+            if nb in goals:
+                found[nb] = nd
+                if first or len(found) == want:
+                    return found, parent, origin
+    return found, parent, origin
+
+
+# campo de flujo compartido por los enemigos: una BFS desde todos los enanos
+# vivos; cada celda apunta al paso siguiente hacia el enano mas cercano
+# se rehace cada FLOW_REFRESH ticks, si un enano se alejo FLOW_MOVE tiles
+# de donde estaba, si murio alguno o si cambio el paso del mapa
+FLOW_REFRESH = 30
+FLOW_MOVE = 3
+
+
+class FlowField:
+    def __init__(self, world_map, refresh=FLOW_REFRESH, move=FLOW_MOVE):
+        self.map = world_map
+        self.w, self.h = world_map.w, world_map.h
+        self.refresh = refresh
+        self.move = move
+        n = self.w * self.h
+        self.parent = array('i', [-1]) * n
+        self.origin = array('i', [-1]) * n
+        # celda fuente -> enano
+        self.owners = {}
+        # (enano, x, y) con que se armo
+        self.seeds = []
+        # False si la BFS corto antes de recorrer todo lo alcanzable
+        self.complete = True
+        self.age = 0
+        self.pass_rev = -1
+        # sube con cada rearmado (los enemigos re-eligen objetivo)
+        self.version = 0
+        self.builds = 0
+
+    def _cell(self, x, y):
+        x, y = int(round(x)), int(round(y))
+        if 0 <= x < self.w and 0 <= y < self.h:
+            return y*self.w + x
+        return -1
+
+    def _stale(self, alive, cells):
+        if self.version == 0 or self.age >= self.refresh:
+            return True
+        if self.map.pass_revision != self.pass_rev:
+            return True
+        if len(alive) != len(self.seeds):
+            return True
+        for d, (sd, sx, sy) in zip(alive, self.seeds):
+            if d is not sd or abs(d.x - sx) + abs(d.y - sy) >= self.move:
+                return True
+        if not self.complete:
+            # enemigo nuevo fuera de lo recorrido
+            return any(self.origin[c] < 0 for c in cells)
+        return False
+
+    def update(self, dwarves, enemies):
+        cells = [c for c in (self._cell(e.x, e.y) for e in enemies if e.hp > 0) if c >= 0]
+        if not cells:
+            return
+        self.age += 1
+        alive = [d for d in dwarves if d.state != "Muerto"]
+        if self._stale(alive, cells):
+            self.rebuild(alive, cells)
+
+    def rebuild(self, dwarves, goals=()):
+        # BFS desde los enanos; corta cuando llego a todas las celdas en goals
+        PROFILER.count("flow.rebuild")
+        w = self.w
+        self.seeds = [(d, d.x, d.y) for d in dwarves]
+        self.owners = {}
+        sources = []
+        for d in dwarves:
+            c = self._cell(d.x, d.y)
+            if c >= 0 and c not in self.owners:
+                self.owners[c] = d
+                sources.append(c)
+        goals = set(goals)
+        found, self.parent, self.origin = reach(self.map, sources, goals)
+        self.complete = not goals or len(found) < len(goals)
+        self.age = 0
+        self.pass_rev = self.map.pass_revision
+        self.version += 1
+        self.builds += 1
+
+    def owner_at(self, x, y):
+        # enano mas cercano por camino desde (x, y), o None si no llega
+        c = self._cell(x, y)
+        if c < 0 or self.origin[c] < 0:
+            return None
+        return self.owners.get(self.origin[c])
+
+    def next_step(self, x, y):
+        # celda siguiente bajando por el campo, o None (sin camino o ya en la fuente)
+        c = self._cell(x, y)
+        if c < 0:
+            return None
+        p = self.parent[c]
+        if p < 0:
+            return None
+        return (p % self.w, p // self.w)
@@ -0,0 +1,208 @@
+import heapq
+from collections import deque
+from pathfinding import LazyPath
+
+# tamaño de cluster (tiles por lado)
+CLUSTER = 16
+# entradas de este largo o mas se parten en dos (una en cada punta)
+SPLIT_RUN = 6
+
+
+# pathfinding jerarquico (HPA*): el mapa se parte en clusters, los bordes
+# pasables entre clusters dan nodos de entrada y dentro de cada cluster se
+# guardan las distancias entre entradas. Todo se arma perezoso: un cluster
+# se (re)calcula la primera vez que una busqueda lo toca despues de un cambio
+class HierarchicalPathfinder:
+    def __init__(self, world_map, cluster=CLUSTER):
+        self.map = world_map
+        self.w, self.h = world_map.w, world_map.h
+        self.c = cluster
+        self.cw = (self.w + cluster - 1) // cluster
+        self.ch = (self.h + cluster - 1) // cluster
+        # borde -> [(a, b)] con a en el cluster izq/arriba y b en el otro
+        self.links = {}
+        # nodo -> nodos del otro lado del borde (costo 1)
+        self.inter = {}
+        # cluster -> {nodo: {nodo: distancia}}
+        self.intra = {}
+        self.dirty = set(range(self.cw * self.ch))
+        self.dirty_borders = set()
+        for cid in self.dirty:
+            self.dirty_borders.update(self._borders_of(cid))
+        self.searches = 0
+        self.expanded = 0
+
+    def cluster_of(self, x, y):
+        return (y // self.c) * self.cw + x // self.c
+
+    def bounds(self, cid):
+        cx, cy = cid % self.cw, cid // self.cw
+        c = self.c
+        return (cx*c, cy*c, min(self.w, (cx+1)*c), min(self.h, (cy+1)*c))
+
+    def _borders_of(self, cid):
+        cx, cy = cid % self.cw, cid // self.cw
+        out = []
+        if cx > 0: out.append(("h", cx-1, cy))
+        if cx + 1 < self.cw: out.append(("h", cx, cy))
+        if cy > 0: out.append(("v", cx, cy-1))
+        if cy + 1 < self.ch: out.append(("v", cx, cy))
+        return out
+
+    def tile_changed(self, x, y):
+        # cambio de paso: el cluster y sus bordes se rehacen cuando se usen
+        cid = self.cluster_of(x, y)
+        self.dirty.add(cid)
+        for kind, cx, cy in self._borders_of(cid):
+            self.dirty_borders.add((kind, cx, cy))
+            # el vecino comparte ese borde
+            self.dirty.add(cy*self.cw + cx)
+            self.dirty.add(cy*self.cw + cx + 1 if kind == "h" else (cy+1)*self.cw + cx)
+
+    def _build_border(self, key):
+        for a, b in self.links.get(key, ()):
+            for u, v in ((a, b), (b, a)):
+                s = self.inter.get(u)
+                if s is not None:
+                    s.discard(v)
+                    if not s:
+                        del self.inter[u]
+        kind, cx, cy = key
+        c, w, passable = self.c, self.w, self.map.passable
+        if kind == "h":
+            xa = (cx+1)*c - 1
+            pairs = [(y*w + xa, y*w + xa + 1) for y in range(cy*c, min(self.h, (cy+1)*c))]
+            touched = (cy*self.cw + cx, cy*self.cw + cx + 1)
+        else:
+            ya = (cy+1)*c - 1
+            pairs = [(ya*w + x, (ya+1)*w + x) for x in range(cx*c, min(w, (cx+1)*c))]
+            touched = (cy*self.cw + cx, (cy+1)*self.cw + cx)
+
+        links = []
+        run = []
+        for a, b in pairs + [(None, None)]:
+            if a is not None and passable[a] and passable[b]:
+                run.append((a, b))
+                continue
+            if run:
+                if len(run) >= SPLIT_RUN:
+                    links += [run[0], run[-1]]
+                else:
+                    links.append(run[len(run)//2])
+                run = []
+        self.links[key] = links
+        for a, b in links:
+            self.inter.setdefault(a, set()).add(b)
+            self.inter.setdefault(b, set()).add(a)
+        self.dirty_borders.discard(key)
+        # cambiaron las entradas de los dos clusters
+        self.dirty.update(touched)
+
+    def _nodes(self, cid):
+        nodes = set()
+        for key in self._borders_of(cid):
+            for a, b in self.links.get(key, ()):
+                nodes.add(a if self.cluster_of(a % self.w, a // self.w) == cid else b)
+        return nodes
+
+    def _local_bfs(self, src, bounds, targets):
+        # distancias desde src a targets sin salir del cluster
+        x0, y0, x1, y1 = bounds
+        w, passable = self.w, self.map.passable
+        dist = {src: 0}
+        found = {src: 0} if src in targets else {}
+        q = deque([src])
+        while q and len(found) < len(targets):
+            c = q.popleft()
+            nd = dist[c] + 1
+            x, y = c % w, c // w
+            for nb, nx, ny in ((c+1, x+1, y), (c-1, x-1, y), (c+w, x, y+1), (c-w, x, y-1)):
+                if x0 <= nx < x1 and y0 <= ny < y1 and nb not in dist and passable[nb]:
+                    dist[nb] = nd
+                    if nb in targets:
+                        found[nb] = nd
+                    q.append(nb)
+        return found
+
+    def _ensure(self, cid):
+        if cid not in self.dirty:
+            return
+        for key in self._borders_of(cid):
+            if key in self.dirty_borders:
+                self._build_border(key)
+        nodes = self._nodes(cid)
+        b = self.bounds(cid)
+        table = {}
+        for n in nodes:
+            d = self._local_bfs(n, b, nodes)
+            d.pop(n, None)
+            table[n] = d
+        self.intra[cid] = table
+        self.dirty.discard(cid)
+
+    def find_path(self, start, goal):
+        # None si caen en el mismo cluster (mejor A* plano), [] si no hay camino
+        w = self.w
+        (sx, sy), (gx, gy) = start, goal
+        cs, ct = self.cluster_of(sx, sy), self.cluster_of(gx, gy)
+        if cs == ct:
+            return None
+        self.searches += 1
+        self._ensure(cs)
+        self._ensure(ct)
+        s, t = sy*w + sx, gy*w + gx
+        start_edges = self._local_bfs(s, self.bounds(cs), set(self.intra[cs]))
+        goal_edges = self._local_bfs(t, self.bounds(ct), set(self.intra[ct]))
+        if not start_edges or not goal_edges:
+            return []
+
+        def hcost(n):
+            return abs(n % w - gx) + abs(n // w - gy)
+
+        g = {s: 0}
+        parent = {s: None}
+        openh = [(hcost(s), 0, s)]
+        found = False
+        while openh:
+            _, gc, n = heapq.heappop(openh)
+            if n == t:
+                found = True
+                break
+            if gc > g[n]:
+                continue
+            self.expanded += 1
+            succ = []
+            if n == s:
+                succ += start_edges.items()
+            cid = self.cluster_of(n % w, n // w)
+            self._ensure(cid)
+            succ += self.intra.get(cid, {}).get(n, {}).items()
+            succ += ((m, 1) for m in self.inter.get(n, ()))
+            if n in goal_edges:
+                succ.append((t, goal_edges[n]))
+            for m, cost in succ:
+                ng = gc + cost
+                if m not in g or ng < g[m]:
+                    g[m] = ng
+                    parent[m] = n
+                    heapq.heappush(openh, (ng + hcost(m), ng, m))
+        if not found:
+            return []
+
+        way = [t]
+        while parent[way[-1]] is not None:
+            way.append(parent[way[-1]])
+        way.reverse()
+        legs = []
+        for a, b in zip(way, way[1:]):
+            cost = g[b] - g[a]
+            if cost > 0:
+                legs.append(((a % w, a // w), (b % w, b // w), cost))
+        return LazyPath(legs, self._refine, self.map.pathfinder.search)
+
+    def _refine(self, a, b):
+        # un tramo: cruce de borde (1 paso) o camino dentro de un cluster
+        if abs(a[0]-b[0]) + abs(a[1]-b[1]) == 1:
+            return [b] if self.map.passable[b[1]*self.w + b[0]] else []
+        cid = self.cluster_of(*a)
+        return self.map.pathfinder.search(a, b, bounds=self.bounds(cid))
@@ -1,24 +1,29 @@
-import pygame, math, random
+import pygame, math, random, time
 import world
 from world import (
-    MapGrid, TILE, load_tree_sprite, load_mine_sprite, load_tower_sprite, load_hospital_sprite, 
-    load_wall_sprite, load_boss_sprites,
-    EMPTY, WALL, FOREST, MINE, WATER, FARM,
-    TOWER, WALL_DEF, HOSPITAL, HOME, GRANARY, COLORS,
-    BOSS_IMGS
+    TILE,
+    EMPTY, FOREST, MINE, WATER, FARM,
+    TOWER, WALL_DEF, HOSPITAL, COLORS,
 )
 from actors import DwarfBase, PonchoRojo, PonchoJefe, Llama
-from planner import Planner
-from events import EventManager
+from sim import SimCore, VIEW_W_TILES, VIEW_H_TILES
+from profiler import PROFILER
+from minimap import Minimap
+from textcache import TEXT, get_font
+from assets import load_assets
 
 FPS = 60
-STEP_DELAY = 10
+# simulacion a paso fijo, aparte del dibujo: SIM_HZ ticks por segundo a x1
+SIM_HZ = 60
+# velocidades (TAB); 0 = lo mas rapido posible
+SPEEDS = (1, 4, 16, 0)
+# atrasado: como mucho estos frames seguidos sin dibujar
+MAX_FRAME_SKIP = 4
+# atraso maximo que se intenta recuperar (segundos), evita la espiral
+MAX_BACKLOG = 0.25
 INFO_WIDTH = 360
 DEFAULT_ORDER_AMOUNT = 1
 
-VIEW_W_TILES = 50
-VIEW_H_TILES = 36
-
 PANEL_BG = (22, 22, 26)
 PANEL_ACCENT = (255, 220, 90)
 TEXT_DIM = (200, 200, 200)
@@ -28,77 +33,38 @@ def clamp(x,a,b): return a if x<a else b if x>b else x
 
 BUILD_NONE, BUILD_WALL, BUILD_TOWER, BUILD_HOSP = range(4)
 
-class Projectile:
-    def __init__(self, x_px, y_px, target, T=28, g=0.45):
-        self.x = x_px
-        self.y = y_px
-        self.target = target
-        self.g = g
-        self.life = T + 10
-        tx = (target.x) * TILE + TILE*0.5
-        ty = (target.y) * TILE + TILE*0.5
-        dx = tx - self.x
-        dy = ty - self.y
-        self.vx = dx / T
-        self.vy = (dy - 0.5 * g * T * T) / T
-
-    def update(self):
-        if self.life <= 0:
-            return False
-        self.x += self.vx
-        self.y += self.vy
-        self.vy += self.g
-        self.life -= 1
-
-        if self.target and self.target.hp > 0:
-            tx = self.target.x * TILE + TILE * 0.5
-            ty = self.target.y * TILE + TILE * 0.5
-            close = (abs(self.x - tx) < 10 and abs(self.y - ty) < 10)
-            if close or self.life <= 0:
-                damage = random.randint(40, 70)
-                self.target.hp -= damage
-                if self.target.hp <= 0:
-                    self.target.hp = 0
-                    print("poncho Rojo eliminado")
-                return False
-        return True
-
-    def draw(self, surf, camx, camy):
-        px = int(self.x - camx*TILE)
-        py = int(self.y - camy*TILE)
-        pygame.draw.circle(surf, (210,210,210), (px,py), 3)
-
-class Particle:
-    def __init__(self, x_px, y_px, text="+1", color=(255, 255, 255), lifetime=30, speed=-0.8):
-        self.x = x_px
-        self.y = y_px
-        self.text = text
-        self.color = color
-        self.lifetime = lifetime
-        self.speed = speed
-        self.alpha = 255
-
-    def update(self):
-        self.lifetime -= 1
-        if self.lifetime <= 0:
-            return False
-        self.y += self.speed
-        self.alpha = max(0, int(255 * (self.lifetime / 30)))
-        return True
-
-    def draw(self, surf, camx, camy, font):
-        if self.lifetime <= 0:
-            return
-        px = int(self.x - camx*TILE)
-        py = int(self.y - camy*TILE)
-        text_surf = font.render(self.text, True, self.color)
-        text_surf.set_alpha(self.alpha)
-        surf.blit(text_surf, (px, py))
+# panel: alto de la fila de cada enano y tramos de la barra de energia
+PANEL_ROW_H = 38
+ENERGY_BUCKETS = 24
+
+# estado que vive en SimCore; Game lo lee (y mueve la camara) como atributo propio
+def _sim_attr(name):
+    return property(lambda self: getattr(self.sim, name),
+                    lambda self, value: setattr(self.sim, name, value))
+
 
 class Game:
-    def __init__(self):
-        world.load_boss_sprites()
-        print("DEBUG post-load: frames jefe =", len(world.BOSS_IMGS))
+    map = _sim_attr("map")
+    dwarves = _sim_attr("dwarves")
+    ponchos = _sim_attr("ponchos")
+    llamas = _sim_attr("llamas")
+    towers = _sim_attr("towers")
+    resources = _sim_attr("resources")
+    projectiles = _sim_attr("projectiles")
+    particles = _sim_attr("particles")
+    planner = _sim_attr("planner")
+    events = _sim_attr("events")
+    defense_mode = _sim_attr("defense_mode")
+    dwarf_index = _sim_attr("dwarf_index")
+    # reloj del mundo (dia/noche, agua, pasos): avanza con la sim, no con los frames
+    step_counter = _sim_attr("step_counter")
+    cost_tower = _sim_attr("cost_tower")
+    cost_wall = _sim_attr("cost_wall")
+    cost_hosp = _sim_attr("cost_hosp")
+    cam_x = _sim_attr("cam_x")
+    cam_y = _sim_attr("cam_y")
+
+    def __init__(self, sim=None):
         pygame.init()
         # tamaño juego
         self.GAME_WIDTH = VIEW_W_TILES*TILE + INFO_WIDTH
@@ -114,63 +80,32 @@ class Game:
         self.clock = pygame.time.Clock()
         self.running = True
         self.paused = True
+        self.speed_idx = 0
 
-        DwarfBase.load_images()
-        PonchoRojo.load_images()
-        Llama.load_images()
-        load_tree_sprite()
-        load_mine_sprite()
-        load_tower_sprite()
-        load_hospital_sprite()
-        load_wall_sprite()
-        load_boss_sprites()
-
-        self.map = MapGrid()
-        self.font = pygame.font.SysFont("consolas", 18, bold=True)
-        self.small = pygame.font.SysFont("consolas", 12)
-        self.cam_x, self.cam_y = 0, 0
-        self.ticks = 0
-
-        self.dwarves = self._spawn_dwarves(4)
-        for d in self.dwarves:
-            d.sx = (d.x - self.cam_x)*TILE + TILE//2
-            d.sy = (d.y - self.cam_y)*TILE + TILE//2
-
-        self.llamas = []
-        for _ in range(5):
-            hx, hy = self.map.home
-            lx = random.randint(hx, hx + 10)
-            ly = random.randint(hy, hy + 10)
-            if self.map.in_bounds(lx, ly) and self.map.grid[ly][lx] != WATER:
-                self.llamas.append(Llama(lx, ly, self.map))
+        # un atlas para todos los sprites (cacheado en disco entre corridas)
+        load_assets()
 
-        self.resources = {"wood": 0, "stone": 0, "food": 0}
-        self.towers = []
-        self.projectiles = []
-        self.particles = []
-
-        self.planner = Planner(self)
-        self.events = EventManager(self.planner, self, enabled=True, view_w=VIEW_W_TILES, view_h=VIEW_H_TILES)
-        self.ponchos = []
+        # sim armada de afuera (benchmarks, escenarios) o una partida nueva
+        self.sim = sim or SimCore(view_w=VIEW_W_TILES, view_h=VIEW_H_TILES)
+        self.font = get_font("consolas", 18, bold=True)
+        self.small = get_font("consolas", 12)
+        self.banner = get_font("consolas", 22, bold=True)
+        # frames dibujados: solo para animaciones de interfaz (siguen en pausa)
+        self.ticks = 0
 
         hx, hy = self.map.home
         self.center_camera(hx, hy)
 
-        self.step_counter = 0
-
-        self.cost_tower = {"wood": 5, "stone": 3}
-        self.cost_wall  = {"stone": 2}
-        self.cost_hosp  = {"wood": 4, "stone": 4}
-
-        self.tower_range = 7
-        self.tower_cooldown = 26
-
         self.build_mode = BUILD_NONE
-        self.heal_rate = 0.6
         self.selected_dwarf = None
-        self.defense_mode = False
         self.panel_scroll_y = 0       
         self.panel_content_height = 0 
+        # F3: tiempos por subsistema en pantalla, F4: grabar/guardar traza
+        self.show_profiler = False
+        self.minimap = None
+        # panel: parte fija (costos, superficie) y filas por enano (clave, superficie)
+        self._panel_cache = None
+        self._row_cache = {}
 
     # cámara
     def _snap_smooth_positions(self):
@@ -183,56 +118,19 @@ class Game:
         self.cam_y = max(0, min(ty - VIEW_H_TILES//2, self.map.h - VIEW_H_TILES))
         self._snap_smooth_positions()
 
-    # spawn 
-    def _spawn_dwarves(self, n):
-        hx,hy = self.map.home
-        candidates=[]
-        for dy in range(-2,3):
-            for dx in range(-2,3):
-                x,y = hx+dx, hy+dy
-                if 0<=x<self.map.w and 0<=y<self.map.h and self.map.grid[y][x] != 1:
-                    candidates.append((x,y))
-        candidates = sorted({c for c in candidates}, key=lambda p: abs(p[0]-hx)+abs(p[1]-hy))
-        dwarves=[]; used=set()
-        for pos in candidates:
-            if len(dwarves)>=n: break
-            if pos not in used:
-                dwarves.append(DwarfBase(*pos)); used.add(pos)
-        while len(dwarves)<n:
-            dwarves.append(DwarfBase(hx, hy))
-        return dwarves
-
-    # recursos 
-    def _can_pay(self, cost: dict) -> bool:
-        return all(self.resources.get(k,0) >= v for k,v in cost.items())
-    def _pay(self, cost: dict):
-        for k,v in cost.items():
-            self.resources[k] = max(0, self.resources.get(k,0) - v)
-
     def _screen_to_grid(self, mx, my):
         gx = mx // TILE + self.cam_x
         gy = my // TILE + self.cam_y
         return int(gx), int(gy)
 
-    def _enqueue_build(self, grid_pos, kind, cost):
-        x,y = grid_pos
-        if not self.map.is_buildable(x,y):
-            print(" No se puede construir aquí.")
-            return
-        if not self._can_pay(cost):
-            print("Recursos insuficientes.")
-            return
-        self._pay(cost)
-        self.planner.push_action("build_at", payload={"pos": (x,y), "kind": kind})
-
-    def _spawn_particle(self, x_grid, y_grid, text, color):
-        px = (x_grid + 0.5) * TILE
-        py = (y_grid + 0.5) * TILE
-        self.particles.append(Particle(px, py, text, color, lifetime=35, speed=-0.7))
-
     # movimiento enanos
     def dwarf_at_screenpos(self, mx, my):
-        for d in self.dwarves:
+        # la posicion suave va hasta ~1 tile atrasada: buscar en radio 2
+        gx = self.cam_x + (mx - TILE//2) / TILE
+        gy = self.cam_y + (my - TILE//2) / TILE
+        # en pausa update no corre: los reclutados con B/N aun no estan en el indice
+        self.sim._sync_indices()
+        for d in self.dwarf_index.query_radius(gx, gy, 2):
             if d.state == "Muerto":
                 continue
             dx = abs(d.sx - mx)
@@ -241,34 +139,65 @@ class Game:
                 return d
         return None
 
-    def command_move_dwarf(self, dwarf, gx, gy):
-        if dwarf.state == "Muerto":
-            return
-        path = self.map.astar((dwarf.x, dwarf.y), (gx, gy))
-        if path:
-            dwarf.assign_task("idle", path, priority=999, meta={"manual": True})
-            dwarf.task = "idle"
-            dwarf.manual_hold = True  # se queda quieto luego
-
     # loop principal
     def run(self):
+        tick_dt = 1.0 / SIM_HZ
+        acc = 0.0
+        skipped = 0
+        last = time.perf_counter()
         while self.running:
-            self.handle_events()
-            self.planner.update()
-            self.events.update()
-            if not self.paused:
-                self.update()
-            self.draw()
-
-            if self.events.active_wave:
-                font = pygame.font.SysFont("consolas", 22, bold=True)
-                text = font.render("OLEADA EN CURSO", True, (255, 80, 80))
-                rect = text.get_rect(center=(VIEW_W_TILES * TILE // 2, 20))
-                self.screen.blit(text, rect)
-
-            pygame.display.flip()
-            self.clock.tick(FPS)
-            self.ticks += 1
+            frame_start = time.perf_counter()
+            elapsed = min(frame_start - last, MAX_BACKLOG)
+            last = frame_start
+            with PROFILER.section("frame"):
+                with PROFILER.section("input"):
+                    self.handle_events()
+
+                speed = SPEEDS[self.speed_idx]
+                behind = False
+                if self.paused:
+                    # ordenes dadas en pausa se asignan igual; el mundo no avanza
+                    acc = 0.0
+                    with PROFILER.section("planner"):
+                        self.planner.update()
+                else:
+                    # ticks fijos hasta ponerse al dia; sin pasarse del tiempo de un frame
+                    if speed:
+                        acc = min(acc + elapsed * speed, MAX_BACKLOG * speed)
+                    deadline = frame_start + 1.0 / FPS
+                    while speed == 0 or acc >= tick_dt:
+                        self.sim.tick()
+                        PROFILER.count("ticks")
+                        if speed:
+                            acc -= tick_dt
+                        if time.perf_counter() >= deadline:
+                            behind = speed == 0 or acc >= tick_dt
+                            break
+
+                # atrasado: saltar el dibujo (pero no siempre, la pantalla no se congela)
+                if behind and skipped < MAX_FRAME_SKIP:
+                    skipped += 1
+                else:
+                    skipped = 0
+                    self._smooth_positions()
+                    with PROFILER.section("draw"):
+                        self.draw()
+
+                    if self.events.active_wave:
+                        text = TEXT.render(self.banner, "OLEADA EN CURSO", (255, 80, 80))
+                        rect = text.get_rect(center=(VIEW_W_TILES * TILE // 2, 20))
+                        self.screen.blit(text, rect)
+
+                    if self.show_profiler:
+                        self._draw_profiler()
+
+                    with PROFILER.section("flip"):
+                        pygame.display.flip()
+                    self.ticks += 1
+            PROFILER.end_frame()
+            if skipped == 0:
+                # a velocidad maxima no se espera
+                self.clock.tick(FPS if speed else 0)
         pygame.quit()
 
     # input
@@ -279,6 +208,9 @@ class Game:
             elif e.type == pygame.KEYDOWN:
                 if   e.key==pygame.K_ESCAPE: self.running=False
                 elif e.key==pygame.K_p:      self.paused = not self.paused
+                elif e.key==pygame.K_TAB:    self.speed_idx = (self.speed_idx + 1) % len(SPEEDS)
+                elif e.key==pygame.K_F3:     self.toggle_profiler()
+                elif e.key==pygame.K_F4:     self.toggle_trace()
                 elif e.key==pygame.K_LEFT:   self.cam_x = max(0, self.cam_x-4); self._snap_smooth_positions()
                 elif e.key==pygame.K_RIGHT:  self.cam_x = min(self.map.w - VIEW_W_TILES, self.cam_x+4); self._snap_smooth_positions()
                 elif e.key==pygame.K_UP:     self.cam_y = max(0, self.cam_y-4); self._snap_smooth_positions()
@@ -290,39 +222,19 @@ class Game:
                 elif e.key==pygame.K_g: self.planner.push_action("farm",   DEFAULT_ORDER_AMOUNT, payload={"force": True})
                 elif e.key==pygame.K_b:
                     costo_enano = {"food": 6} 
-                    if self._can_pay(costo_enano):
-                        self._pay(costo_enano)
-                        self.dwarves.extend(self._spawn_dwarves(1))
+                    if self.sim._can_pay(costo_enano):
+                        self.sim._pay(costo_enano)
+                        self.dwarves.extend(self.sim._spawn_dwarves(1))
                         print("Nuevo enano reclutado (Costo: 6 Papa)")
                     else:
                         print("No hay suficiente Papa para un nuevo BOLIVIANITO.")
                 elif e.key==pygame.K_h: self.planner.push_action("hunt",   DEFAULT_ORDER_AMOUNT, payload={"force": True})
 
                 elif e.key==pygame.K_d:
-                    self.defense_mode = not getattr(self, "defense_mode", False)
-                    if self.defense_mode:
-                        print("Modo defensa ACTIVADO")
-                        for d in self.dwarves:
-                            if d.state != "Muerto":
-                                d.cancel_task()
-                                d.defend()
-                        for tw in self.towers:
-                            if "militia" not in tw:
-                                tw["militia"] = 0
-                            while self.resources.get("food",0) >= 2 and tw["militia"] < 3:
-                                self.resources["food"] -= 2
-                                tw["militia"] += 1
-                        print("Milicia desplegada en torres")
-                    else:
-                        print("Modo defensa DESACTIVADO")
-                        for d in self.dwarves:
-                            if d.state != "Muerto" and d.state == "Defendiendo":
-                                d.state = "Idle"
-                                d.task  = "idle"
-                                d.order_priority = 0
+                    self.sim.set_defense(not self.defense_mode)
 
                 elif e.key==pygame.K_n:
-                    self.dwarves.extend(self._spawn_dwarves(1))
+                    self.dwarves.extend(self.sim._spawn_dwarves(1))
                     print("uevo enano reclutado")
 
                 elif e.key==pygame.K_l:
@@ -330,7 +242,10 @@ class Game:
                     lx = hx + random.randint(-3,3)
                     ly = hy + random.randint(-3,3)
                     if self.map.in_bounds(lx,ly) and self.map.grid[ly][lx] != WATER:
-                        self.llamas.append(Llama(lx,ly,self.map))
+                        llama = Llama(lx,ly,self.map)
+                        self.llamas.append(llama)
+                        # el planner busca presas en el indice (en pausa update no lo sincroniza)
+                        self.sim.llama_index.move(llama, lx, ly)
                         print("llama agregada")
 
                 elif e.key==pygame.K_o:
@@ -372,11 +287,11 @@ class Game:
                         if mx < panel_x: # Click en el mundo del juego
                             gx, gy = self._screen_to_grid(mx, my)
                             if self.build_mode == BUILD_WALL:
-                                self._enqueue_build((gx,gy), WALL_DEF, self.cost_wall)
+                                self.sim._enqueue_build((gx,gy), WALL_DEF, self.cost_wall)
                             elif self.build_mode == BUILD_TOWER:
-                                self._enqueue_build((gx,gy), TOWER, self.cost_tower)
+                                self.sim._enqueue_build((gx,gy), TOWER, self.cost_tower)
                             elif self.build_mode == BUILD_HOSP:
-                                self._enqueue_build((gx,gy), HOSPITAL, self.cost_hosp)
+                                self.sim._enqueue_build((gx,gy), HOSPITAL, self.cost_hosp)
 
                 elif e.button == 3:
                     if mx < panel_x: 
@@ -393,162 +308,28 @@ class Game:
                                     if tile_kind in (FOREST, MINE, FARM):
                                         print("No puedes mandar al enano directo a taladrar recurso.")
                                     else:
-                                        self.command_move_dwarf(self.selected_dwarf, gx, gy)
+                                        self.sim.command_move_dwarf(self.selected_dwarf, gx, gy)
                                         print(f"Moviendo a {gx},{gy}")
 
-    def update(self):
-        self.step_counter += 1
-
-        if self.step_counter % STEP_DELAY == 0:
-            hospital_positions = list(self.map.positions_for(HOSPITAL))
-            for d in self.dwarves:
-                if d.state != "Muerto" and d.task == "idle" and d.energy < 18 and hospital_positions:
-                    hx,hy = min(hospital_positions, key=lambda p: abs(p[0]-d.x)+abs(p[1]-d.y))
-                    self.planner.push_action("heal", payload={"pos": (hx,hy)})
-
-            for d in self.dwarves:
-                before = (d.x,d.y, d.state, d.task, d.timer, d.meta)
-                d.move()
-                d.tick_stats(self.map)
-
-                if getattr(self, "defense_mode", False):
-                    for p in list(self.ponchos):
-                        if abs(int(p.x) - d.x) + abs(int(p.y) - d.y) <= 1 and p.hp > 0 and d.state != "Muerto":
-                            damage = 150 if d.oficio == "Guardia" else 80
-                            p.hp -= damage
-                            if p.hp <= 0:
-                                self.ponchos.remove(p)
-                                self._spawn_particle(int(p.x), int(p.y),"💥", (255,100,100))
-
-                if before[2]=="Trabajando" and d.state=="Idle":
-                    task = before[3]
-                    bx, by = before[0], before[1]
-                    meta = before[5] or {}
-
-                    # recoeltar
-                    if task in ("wood", "mine", "farm"):
-                        if task == "wood":
-                            self.resources["wood"] += 1
-                            gain_texts = [("+1 Madera", (230, 200, 150))]
-                        elif task == "mine":
-                            self.resources["stone"] += 1
-                            gain_texts = [("+1 Piedra", (200, 200, 210))]
-                        elif task == "hunt":
-                            gain_texts = []
-                            llama = meta.get("target")
-                            if llama and llama.hp > 0:
-                                llama.die()
-                                self.resources["food"] += 5 #comida
-                                self._spawn_particle(int(llama.x), int(llama.y), "+5 carne", (255,100,100))
-                        else:  # farm
-                            self.resources["food"] += 1
-                            gain_texts = [
-                                ("+1 Papa", (255,230,100)),
-                                ("+1 Coca", (100,255,100))
-                            ]
-
-                        for txt, col in gain_texts:
-                            self._spawn_particle(bx, by, txt, col)
-
-                        # eliminar tile
-                        if (bx,by) in self.map.resource_amount:
-                            del self.map.resource_amount[(bx,by)]
-
-                        kind_here = self.map.grid[by][bx]
-                        if kind_here in (FOREST, MINE, FARM):
-                            if kind_here in self.map.idx and (bx,by) in self.map.idx[kind_here]:
-                                self.map.idx[kind_here].discard((bx,by))
-                            self.map.grid[by][bx] = EMPTY
-                    
-                    elif task == "hunt": 
-                        llama = meta.get("target")
-                        if llama and llama.hp > 0:
-                            llama.die() 
-                            self.resources["food"] += 5 
-                            self._spawn_particle(int(llama.x), int(llama.y), "+5 Papa", (255,100,100))
-
-                    elif task == "build_at":
-                        kind = meta.get("kind")
-                        px, py = meta.get("pos", (bx,by))
-                        if self.map.is_buildable(px,py):
-                            self.map.set_tile(px,py, kind)
-                            if kind == TOWER:
-                                self.towers.append({"x":px, "y":py, "cd":0, "militia":0})
-                        else:
-                            # reembolso min (no lo veo necesario)
-                            self.resources["wood"] += 1
-                            self.resources["stone"] += 1
-
-        # mov suave
+    def _smooth_positions(self):
+        # mov suave (una vez por frame dibujado, no por tick)
         for d in self.dwarves:
             tx = (d.x - self.cam_x)*TILE + TILE//2
             ty = (d.y - self.cam_y)*TILE + TILE//2
             d.sx = lerp(d.sx, tx, 0.28)
             d.sy = lerp(d.sy, ty, 0.28)
 
-        # enemigos
-        for p in list(self.ponchos):
-            p.update(self.dwarves, self.map)
-            if p.hp <= 0:
-                self.ponchos.remove(p)
-
-        # curacion
-        hosp_positions = list(self.map.positions_for(HOSPITAL))
-        for d in self.dwarves:
-            if d.state != "Muerto" and d.task == "idle" and d.energy < 100:
-                for (hx, hy) in hosp_positions:
-                    dist = abs(hx - d.x) + abs(hy - d.y)
-                    if dist <= 7:
-                        d.energy = min(100, d.energy + self.heal_rate)
-                        break
-
-        # torres 
-        if self.towers and self.ponchos:
-            for tw in self.towers:
-                if tw.get("cd",0) > 0:
-                    tw["cd"] -= 1
-                else:
-                    tx, ty = tw["x"], tw["y"]
-                    target = None
-                    best_d = 999999
-                    for p in self.ponchos:
-                        dman = abs(int(p.x) - tx) + abs(int(p.y) - ty)
-                        if dman <= self.tower_range and dman < best_d and p.hp > 0:
-                            best_d = dman
-                            target = p
-                    if target:
-                        sx = tx*TILE + TILE*0.5
-                        sy = ty*TILE + TILE*0.2
-                        self.projectiles.append(Projectile(sx, sy, target))
-                        tw["cd"] = self.tower_cooldown
-
-        # milicia (incompleto )
-        for tw in self.towers:
-            militia = tw.get("militia", 0)
-            if militia <= 0:
-                continue
-            tx, ty = tw["x"], tw["y"]
-            for p in list(self.ponchos):
-                dist = abs(int(p.x) - tx) + abs(int(p.y) - ty)
-                if dist <= 2 and p.hp > 0:
-                    p.hp -= 60 * militia
-                    if p.hp <= 0:
-                        self.ponchos.remove(p)
-                        self._spawn_particle(int(p.x), int(p.y), "💥", (255,180,60))
-
-        for llama in self.llamas:
-            llama.update()
-
-        self.llamas = [llama for llama in self.llamas if llama.hp > 0]
-        
-        self.projectiles = [pr for pr in self.projectiles if pr.update()]
-        self.particles = [p for p in self.particles if p.update()]
-
     #render 
     def draw(self):
-        self.map.draw(self.screen, camx=self.cam_x, camy=self.cam_y,
-                      view_w=VIEW_W_TILES, view_h=VIEW_H_TILES, tick=self.ticks)
-
+        with PROFILER.section("draw.map"):
+            self.map.draw(self.screen, camx=self.cam_x, camy=self.cam_y,
+                          view_w=VIEW_W_TILES, view_h=VIEW_H_TILES, tick=self.step_counter)
+        with PROFILER.section("draw.actors"):
+            self._draw_actors()
+        with PROFILER.section("draw.panel"):
+            self._draw_panel()
+
+    def _draw_actors(self):
         if self.build_mode != BUILD_NONE:
             mx, my = pygame.mouse.get_pos()
             if mx < VIEW_W_TILES*TILE:
@@ -570,7 +351,7 @@ class Game:
         for p in self.particles:
             p.draw(self.screen, self.cam_x, self.cam_y, self.small)
 
-        day = (math.sin(self.ticks*0.001)+1)/2
+        day = (math.sin(self.step_counter*0.001)+1)/2
         night_alpha = int(clamp(180*(1-day), 0, 140))
         if night_alpha>0:
             overlay = pygame.Surface((VIEW_W_TILES*TILE, VIEW_H_TILES*TILE), pygame.SRCALPHA)
@@ -582,6 +363,7 @@ class Game:
             cx = int(d.sx); cy = int(d.sy)
             pygame.draw.ellipse(self.screen, (0,0,0,80), (cx-6, cy+4, 12, 6))
             if d.state == "Trabajando":
+                # pulso de interfaz: sigue con los frames
                 r = 10 + int(2 * math.sin(self.ticks * 0.2))
                 pygame.draw.circle(self.screen, (255,230,140,90), (cx,cy), r, 2)
 
@@ -590,15 +372,15 @@ class Game:
             elif d.state == "Idle":
                 img = DwarfBase.idle_img
             elif d.state == "Defendiendo":
-                img = DwarfBase.walk_imgs[(self.ticks // 5) % 2]
+                img = DwarfBase.walk_imgs[(self.step_counter // 5) % 2]
             else:
-                img = DwarfBase.walk_imgs[(self.ticks // 10) % 2]
+                img = DwarfBase.walk_imgs[(self.step_counter // 10) % 2]
 
             rect = img.get_rect(center=(cx, cy))
             self.screen.blit(img, rect)
 
             label = f"{d.name[0]}{d.oficio[0]}"
-            txt = self.small.render(label, True, (0,0,0))
+            txt = TEXT.render(self.small, label, (0,0,0))
             self.screen.blit(txt, (cx-6, cy-16))
 
             if d.state == "Trabajando":
@@ -636,7 +418,7 @@ class Game:
                 if p.state == "Idle":
                     img = PonchoRojo.idle_img
                 else:
-                    img = PonchoRojo.walk_imgs[(self.ticks // 10) % 2]
+                    img = PonchoRojo.walk_imgs[(self.step_counter // 10) % 2]
 
             # dibujar sprite
             if img is not None:
@@ -653,50 +435,22 @@ class Game:
 
             # etiqueta jefe
             if getattr(p, "is_boss", False):
-                boss_tag = self.small.render("JEFE", True, (255, 80, 80))
+                boss_tag = TEXT.render(self.small, "JEFE", (255, 80, 80))
                 self.screen.blit(boss_tag, (cx - 12, cy - 32))
 
         # llamas
         for llama in self.llamas:
-            llama.draw(self.screen, self.cam_x, self.cam_y, self.ticks)
-
-        panel_x = VIEW_W_TILES*TILE
-        panel_view_height = VIEW_H_TILES*TILE 
-        
-        pygame.draw.rect(self.screen, PANEL_BG, (panel_x, 0, INFO_WIDTH, panel_view_height))
-        
+            llama.draw(self.screen, self.cam_x, self.cam_y, self.step_counter)
 
-        clip_rect = pygame.Rect(panel_x, 0, INFO_WIDTH, panel_view_height)
-        self.screen.set_clip(clip_rect)
+    def _panel_static(self):
+        # titulos y ayuda de teclas: una superficie; se rehace solo si cambian los costos
+        key = tuple(tuple(c.items()) for c in (self.cost_wall, self.cost_tower, self.cost_hosp))
+        if self._panel_cache is not None and self._panel_cache[0] == key:
+            return self._panel_cache[1]
 
-        
-        y = 8 
-        
-        self.screen.blit(self.font.render("Colonia", True, PANEL_ACCENT), (panel_x+12, y - self.panel_scroll_y)); 
-        y += 22
-
-        status = "PAUSADO" if self.paused else "Corriendo"
-        self.screen.blit(self.small.render(f"Estado: {status}", True, TEXT_DIM), (panel_x+12, y - self.panel_scroll_y)); 
-        y += 16
-
-        res_line = f"Madera: {self.resources['wood']}  Piedra: {self.resources['stone']}  Comida: {self.resources['food']}"
-        self.screen.blit(self.small.render(res_line, True, (230,230,230)), (panel_x+12, y - self.panel_scroll_y)); 
-        y += 20
-
-        # hud
-        self.screen.blit(self.small.render("Ciclo solar", True, TEXT_DIM),(panel_x+240, 8 - self.panel_scroll_y)) # y=8
-        ang = (self.ticks*0.001) % (2*math.pi)
-        cx_orbit = panel_x + 300
-        cy_orbit = 40 - self.panel_scroll_y
-        r_orbit = 20
-        sx = int(cx_orbit + math.cos(ang) * r_orbit)
-        sy = int(cy_orbit - math.sin(ang) * r_orbit) # cy_orbit ya tiene el scroll aplicado
-        pygame.draw.circle(self.screen, (80,80,90), (cx_orbit, cy_orbit), r_orbit, 1)
-        pygame.draw.circle(self.screen, (255,220,100), (sx,sy), 6)
+        lines = [(self.font, "Colonia", PANEL_ACCENT, 8)]
         y = 78
-        self.screen.blit(self.small.render("Construcción:", True, PANEL_ACCENT), (panel_x+12, y - self.panel_scroll_y)); 
-        y += 16
-        
+        lines.append((self.small, "Construcción:", PANEL_ACCENT, y)); y += 16
         build_lines = [
             f"[1] Muro     (Piedra x{self.cost_wall['stone']})",
             f"[2] Torre    (Madera x{self.cost_tower['wood']}  Piedra x{self.cost_tower['stone']})",
@@ -704,61 +458,115 @@ class Game:
             "Click: colocar | Q: salir modo"
         ]
         for line in build_lines:
-            self.screen.blit(self.small.render(line, True, (210,210,210)), (panel_x+12, y - self.panel_scroll_y))
-            y += 14
+            lines.append((self.small, line, (210,210,210), y)); y += 14
 
         y += 8
-        self.screen.blit(self.small.render("Tareas:", True, PANEL_ACCENT), (panel_x+12, y - self.panel_scroll_y)); 
-        y += 16
-        
+        lines.append((self.small, "Tareas:", PANEL_ACCENT, y)); y += 16
         ctrl_lines = [
             "F: Leña   M: Mina   G: Granja",
             "B: Generar enano.   H: Cazar",
             "D: Defensa",
             "N: Nuevo enano   L: Llama",
             "O: Oleada        J: Jefe",
+            "TAB: Velocidad (x1/x4/x16/max)",
+            "F3: Tiempos      F4: Grabar traza",
             "Click derecho: seleccionar / mover enano"
         ]
         for line in ctrl_lines:
-            self.screen.blit(self.small.render(line, True, TEXT_DIM), (panel_x+12, y - self.panel_scroll_y))
-            y += 14
+            lines.append((self.small, line, TEXT_DIM, y)); y += 14
 
         y += 8
-        self.screen.blit(self.font.render("Bolivianitos", True, PANEL_ACCENT), (panel_x+12, y - self.panel_scroll_y)); 
-        y += 22
+        lines.append((self.font, "Bolivianitos", PANEL_ACCENT, y)); y += 22
+
+        surf = pygame.Surface((INFO_WIDTH, y))
+        surf.fill(PANEL_BG)
+        for font, text, color, ly in lines:
+            surf.blit(font.render(text, True, color), (12, ly))
+        surf.blit(self.small.render("Ciclo solar", True, TEXT_DIM), (240, 8))
+        surf = surf.convert()
+        self._panel_cache = (key, surf)
+        return surf
+
+    def _panel_row(self, d):
+        # fila de un enano; se vuelve a dibujar solo si cambia su estado o el tramo de energia
+        max_energy = 150 if d.oficio == "Guardia" else 100
+        pfill = max(0, min(max_energy, d.energy)) / max_energy
+        bucket = int(pfill * ENERGY_BUCKETS)
+        color = (0,200,90) if pfill>0.5 else (255,200,50) if pfill>0.25 else (220,60,60)
+        key = (d.state, bucket, color)
+        cached = self._row_cache.get(d)
+        if cached is not None and cached[0] == key:
+            return cached[1]
+
+        row = pygame.Surface((INFO_WIDTH - 12, PANEL_ROW_H))
+        row.fill(PANEL_BG)
+        name = f"{d.name.split()[0]} ({d.oficio})"
+        row.blit(TEXT.render(self.small, name, (230,230,230)), (0, 0))
+        row.blit(TEXT.render(self.small, f"{d.state}", (180,180,180)), (0, 14))
+        bar_w, bar_h = 120, 6
+        filled = bar_w * bucket // ENERGY_BUCKETS
+        pygame.draw.rect(row, (45,45,48), (0, 24, bar_w, bar_h), border_radius=2)
+        pygame.draw.rect(row, color, (0, 24, filled, bar_h), border_radius=2)
+        pygame.draw.rect(row, (10,10,12), (0, 24, bar_w, bar_h), 1)
+        row = row.convert()
+        self._row_cache[d] = (key, row)
+        return row
+
+    def _draw_panel(self):
+        panel_x = VIEW_W_TILES*TILE
+        panel_view_height = VIEW_H_TILES*TILE 
+        scroll = self.panel_scroll_y
+        
+        pygame.draw.rect(self.screen, PANEL_BG, (panel_x, 0, INFO_WIDTH, panel_view_height))
 
-        # lista enanos
-        for d in self.dwarves:
-            name = f"{d.name.split()[0]} ({d.oficio})"
-            self.screen.blit(self.small.render(name, True, (230,230,230)), (panel_x+12, y - self.panel_scroll_y)); 
-            y += 14
-
-            self.screen.blit(self.small.render(f"{d.state}", True, (180,180,180)), (panel_x+12, y - self.panel_scroll_y)); 
-            y += 10
-
-            bar_w, bar_h = 120, 6
-            # vida guard
-            max_energy = 150 if d.oficio == "Guardia" else 100
-            energy_clamped = max(0, min(max_energy, d.energy))
-            pfill = energy_clamped / max_energy # Dividir por 150 o 100
-            
-            filled = int(bar_w * pfill)
-            color = (0,200,90) if pfill>0.5 else (255,200,50) if pfill>0.25 else (220,60,60)
-            
-            # Posición de la barra
-            bar_y = y - self.panel_scroll_y
-            pygame.draw.rect(self.screen, (45,45,48), (panel_x+12, bar_y, bar_w, bar_h), border_radius=2)
-            pygame.draw.rect(self.screen, color, (panel_x+12, bar_y, filled, bar_h), border_radius=2)
-            pygame.draw.rect(self.screen, (10,10,12), (panel_x+12, bar_y, bar_w, bar_h), 1)
-            y += 14
+        clip_rect = pygame.Rect(panel_x, 0, INFO_WIDTH, panel_view_height)
+        self.screen.set_clip(clip_rect)
+
+        # partes fijas de una vez; encima lo que cambia
+        static = self._panel_static()
+        list_top = static.get_height()
+        if scroll < list_top:
+            self.screen.blit(static, (panel_x, -scroll))
+
+            speed = SPEEDS[self.speed_idx]
+            status = "PAUSADO" if self.paused else f"Corriendo x{speed}" if speed else "Corriendo (max)"
+            self.screen.blit(TEXT.render(self.small, f"Estado: {status}", TEXT_DIM), (panel_x+12, 30 - scroll))
+
+            res_line = f"Madera: {self.resources['wood']}  Piedra: {self.resources['stone']}  Comida: {self.resources['food']}"
+            TEXT.blit_glyphs(self.screen, self.small, res_line, (230,230,230), (panel_x+12, 46 - scroll))
+
+            # hud: el sol sigue la hora del dia
+            ang = (self.step_counter*0.001) % (2*math.pi)
+            cx_orbit = panel_x + 300
+            cy_orbit = 40 - scroll
+            r_orbit = 20
+            sx = int(cx_orbit + math.cos(ang) * r_orbit)
+            sy = int(cy_orbit - math.sin(ang) * r_orbit) # cy_orbit ya tiene el scroll aplicado
+            pygame.draw.circle(self.screen, (80,80,90), (cx_orbit, cy_orbit), r_orbit, 1)
+            pygame.draw.circle(self.screen, (255,220,100), (sx,sy), 6)
+
+        # lista enanos: solo las filas dentro de la ventana del scroll
+        n = len(self.dwarves)
+        first = max(0, (scroll - list_top) // PANEL_ROW_H)
+        last = min(n, (scroll + panel_view_height - list_top) // PANEL_ROW_H + 1)
+        for i in range(first, last):
+            row = self._panel_row(self.dwarves[i])
+            self.screen.blit(row, (panel_x+12, list_top + i*PANEL_ROW_H - scroll))
+        if len(self._row_cache) > n:
+            alive = set(self.dwarves)
+            self._row_cache = {d: v for d, v in self._row_cache.items() if d in alive}
+        y = list_top + n*PANEL_ROW_H
 
         # minimapa
         y += 10
-        self._draw_minimap(panel_x+12, y - self.panel_scroll_y) 
+        if y - 14 - scroll < panel_view_height:
+            with PROFILER.section("draw.minimap"):
+                self._draw_minimap(panel_x+12, y - scroll) 
         y += 80 + 6
 
-        heap_size = len(self.planner.heap.data)
-        self.screen.blit(self.font.render(f"Heap: {heap_size}", True, PANEL_ACCENT),(panel_x+12, y - self.panel_scroll_y))
+        # ordenes en cola (unidades que faltan)
+        heap = self.planner.heap
+        TEXT.blit_glyphs(self.screen, self.font, f"Heap: {len(heap)} ({heap.units()})", PANEL_ACCENT, (panel_x+12, y - scroll))
         y += 30 
 
         # Guardar la altura total
@@ -790,57 +598,50 @@ class Game:
             pygame.draw.rect(self.screen, (10, 10, 12), (scrollbar_x, track_y, 6, track_h), border_radius=2)
             pygame.draw.rect(self.screen, (80, 80, 85), (scrollbar_x, thumb_y, 6, thumb_h), border_radius=3)
 
+    # profiler
+    def toggle_profiler(self):
+        self.show_profiler = not self.show_profiler
+        PROFILER.set_enabled(self.show_profiler or PROFILER.tracing)
+        if self.show_profiler:
+            PROFILER.reset()
+
+    def toggle_trace(self):
+        if not PROFILER.tracing:
+            PROFILER.set_enabled(True)
+            PROFILER.start_trace()
+            print("Grabando traza (F4 para guardar)")
+            return
+        PROFILER.stop_trace()
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        n = PROFILER.dump_trace(f"trace_{stamp}.json")
+        PROFILER.dump_summary(f"profile_{stamp}.json")
+        print(f"Traza guardada: trace_{stamp}.json ({n} eventos), resumen: profile_{stamp}.json")
+        PROFILER.set_enabled(self.show_profiler)
+
+    def _draw_profiler(self):
+        rows, counts = PROFILER.summary()
+        lines = [f"{'seccion':16s} {'prom':>7s} {'max':>7s}  ms ({min(PROFILER.frames, PROFILER.window)} frames)"]
+        for name, avg, mx in rows[:16]:
+            lines.append(f"{name:16s} {avg:7.2f} {mx:7.2f}")
+        for name in sorted(counts):
+            lines.append(f"{name:16s} {counts[name]:7.2f} /frame")
+        if PROFILER.tracing:
+            lines.append(f"GRABANDO traza: {len(PROFILER.trace)} eventos")
+        lh = 13
+        box = pygame.Surface((330, lh*len(lines) + 8), pygame.SRCALPHA)
+        box.fill((0, 0, 0, 170))
+        for i, line in enumerate(lines):
+            TEXT.blit_glyphs(box, self.small, line, (200, 255, 200) if i else PANEL_ACCENT, (6, 4 + i*lh))
+        self.screen.blit(box, (8, 40))
+
     def _draw_minimap(self, px, py):
-        mw, mh = 120, 80
-        mm = pygame.Surface((mw, mh))
-        sx = max(1, self.map.w // mw)
-        sy = max(1, self.map.h // mh)
-        for y in range(0, self.map.h, sy):
-            ry = (y//sy)
-            if ry>=mh: break
-            for x in range(0, self.map.w, sx):
-                rx = (x//sx)
-                if rx>=mw: break
-                kind = self.map.grid[y][x]
-                mm.set_at((rx,ry), pygame.Color(*self._mini_color(kind)))
-        vx = int(self.cam_x / max(1,self.map.w) * mw)
-        vy = int(self.cam_y / max(1,self.map.h) * mh)
-        vw = max(2, int(VIEW_W_TILES / max(1,self.map.w) * mw))
-        vh = max(2, int(VIEW_H_TILES / max(1,self.map.h) * mh))
-        pygame.draw.rect(mm, (255,255,255), (vx,vy,vw,vh), 1)
-
-        self.screen.blit(self.small.render("Minimapa", True, TEXT_DIM), (px, py-14))
-        self.screen.blit(mm, (px, py))
-
-    def _mini_color(self, kind):
-        if kind==FOREST:  return (40,160,60)
-        if kind==MINE:    return (160,120,70)
-        if kind==FARM:    return (200,150,80)
-        if kind==WATER:   return (60,100,180)
-        if kind==HOME:    return (120,140,255)
-        if kind==GRANARY: return (220,200,90)
-        if kind==WALL_DEF:return (160,160,160)
-        if kind==TOWER:   return (230,215,90)
-        if kind==HOSPITAL:return (210,120,160)
-        if kind==WALL:    return (70,70,80)
-        return (120,180,130)
-
-    # usado por planner
-    def find_nearest(self, dw, tile_type):
-        positions = list(self.map.positions_for(tile_type))
-        if not positions:
-            return None, []
-        sx, sy = dw.x, dw.y
-        positions.sort(key=lambda p: abs(p[0]-sx)+abs(p[1]-sy))
-        TRIES = min(20, len(positions))
-        for i in range(TRIES):
-            goal = positions[i]
-            path = self.map.astar((sx,sy), goal)
-            if path:
-                return goal, path
-        goal = positions[0]
-        path = self.map.astar((sx,sy), goal)
-        return goal, path or []
+        # la sim puede cambiar (benchmarks): el minimapa sigue al mapa actual
+        if self.minimap is None or self.minimap.map is not self.map:
+            if self.minimap is not None:
+                self.minimap.detach()
+            self.minimap = Minimap(self.map)
+        self.screen.blit(TEXT.render(self.small, "Minimapa", TEXT_DIM), (px, py-14))
+        self.minimap.draw(self.screen, px, py, self.cam_x, self.cam_y, VIEW_W_TILES, VIEW_H_TILES)
 
 if __name__ == "__main__":
     Game().run()
@@ -0,0 +1,101 @@
+# asignacion de costo minimo (metodo hungaro por caminos de aumento mas cortos)
+# filas = enanos, columnas = grupos de tareas iguales con cupo (capacity)
+# asi 500 "wood" son una sola columna con cupo 500 y no 500 columnas
+#   assign(cost, capacity) -> {fila: columna}
+# cost[i][j] = None si la fila i no puede tomar la columna j
+# resultado: la mayor cantidad de asignaciones posible y, entre esas, el menor costo total
+#
+# las filas entran de a una; el camino de aumento se busca solo entre columnas
+# (Dijkstra con potenciales): pasar de la columna j a la k cuesta lo que cuesta
+# mover a la fila de j mas barata de mover, y eso lo guarda un heap por par (j, k)
+import heapq
+
+INF = float("inf")
+
+
+def assign(cost, capacity):
+    n = len(cost)
+    if not n or not capacity:
+        return {}
+    # columna extra "sin tarea" con cupo infinito y costo enorme: cada fila nueva
+    # puede desplazar a otra si asi entran mas filas o baja el costo total
+    top = max((abs(c) for row in cost for c in row if c is not None), default=0)
+    big = 2 * top * (n + 1) + 1
+    rows = [list(row) + [big] for row in cost]
+    m = len(capacity) + 1
+    skip = m - 1
+    free = list(capacity) + [n]
+    row_of = [-1] * n
+    pot = [0] * m
+    # moves[j][k] = heap de (costo de pasar la fila de j a k, fila)
+    moves = [[[] for _ in range(m)] for _ in range(m)]
+
+    def place(i, j):
+        row_of[i] = j
+        ci = rows[i]
+        cij = ci[j]
+        for k in range(m):
+            if k != j and ci[k] is not None:
+                heapq.heappush(moves[j][k], (ci[k] - cij, i))
+
+    def cheapest(j, k):
+        # las filas que ya se fueron de j quedan en el heap hasta que asoman
+        h = moves[j][k]
+        while h and row_of[h[0][1]] != j:
+            heapq.heappop(h)
+        return h[0] if h else None
+
+    for r in range(n):
+        cr = rows[r]
+        dist = [INF] * m
+        via = [None] * m
+        done = [False] * m
+        for k in range(m):
+            if cr[k] is not None:
+                dist[k] = cr[k] - pot[k]
+
+        sink = -1
+        while True:
+            j, dj = -1, INF
+            for k in range(m):
+                if not done[k] and dist[k] < dj:
+                    j, dj = k, dist[k]
+            if j < 0:
+                break
+            done[j] = True
+            if free[j] > 0:
+                sink = j
+                break
+            pj = pot[j]
+            for k in range(m):
+                if done[k]:
+                    continue
+                e = cheapest(j, k)
+                if e is None:
+                    continue
+                nd = dj + e[0] + pj - pot[k]
+                if nd < dist[k]:
+                    dist[k] = nd
+                    via[k] = (j, e[1])
+        if sink < 0:
+            continue
+
+        # potenciales nuevos: siguen sin aristas negativas para la proxima fila
+        d_sink = dist[sink]
+        for k in range(m):
+            pot[k] += min(dist[k], d_sink)
+
+        # aumentar: cada fila del camino pasa a la columna siguiente
+        free[sink] -= 1
+        k = sink
+        while via[k] is not None:
+            j, i = via[k]
+            place(i, k)
+            k = j
+        place(r, k)
+
+    return {i: j for i, j in enumerate(row_of) if 0 <= j < skip}
+
+
+def total_cost(cost, match):
+    return sum(cost[i][j] for i, j in match.items())
@@ -0,0 +1,86 @@
+# minimapa persistente: se arma una vez desde una tabla tipo -> color
+# y despues solo se repintan los pixeles de las celdas que cambian
+import pygame
+from world import (
+    EMPTY, WALL, FOREST, MINE, WATER, FARM, GRANARY, HOME,
+    TOWER, WALL_DEF, HOSPITAL,
+)
+
+MINI_W, MINI_H = 120, 80
+
+MINI_COLORS = {
+    EMPTY:    (120, 180, 130),
+    FOREST:   (40, 160, 60),
+    MINE:     (160, 120, 70),
+    FARM:     (200, 150, 80),
+    WATER:    (60, 100, 180),
+    HOME:     (120, 140, 255),
+    GRANARY:  (220, 200, 90),
+    WALL_DEF: (160, 160, 160),
+    TOWER:    (230, 215, 90),
+    HOSPITAL: (210, 120, 160),
+    WALL:     (70, 70, 80),
+}
+MINI_DEFAULT = MINI_COLORS[EMPTY]
+
+
+def mini_color(kind):
+    return MINI_COLORS.get(kind, MINI_DEFAULT)
+
+
+class Minimap:
+    def __init__(self, world_map, w=MINI_W, h=MINI_H):
+        self.map = world_map
+        self.w, self.h = w, h
+        # pixel -> celda muestreada (centro del pixel); sirve para achicar y agrandar
+        self.src_x = [((2*rx + 1) * world_map.w) // (2*w) for rx in range(w)]
+        self.src_y = [((2*ry + 1) * world_map.h) // (2*h) for ry in range(h)]
+        # celda -> pixeles que la muestran (al agrandar una celda ocupa varios)
+        self.cols, self.rows = {}, {}
+        for rx, x in enumerate(self.src_x):
+            self.cols.setdefault(x, []).append(rx)
+        for ry, y in enumerate(self.src_y):
+            self.rows.setdefault(y, []).append(ry)
+        self.surface = None
+        self.updates = 0
+        world_map.tile_listeners.append(self.tile_changed)
+
+    def detach(self):
+        if self.tile_changed in self.map.tile_listeners:
+            self.map.tile_listeners.remove(self.tile_changed)
+
+    def build(self):
+        # todo el minimapa de una: bytes RGB armados con la tabla, un solo frombuffer
+        grid = self.map.grid
+        lut = {k: bytes(c) for k, c in MINI_COLORS.items()}
+        default = bytes(MINI_DEFAULT)
+        buf = b"".join(lut.get(row[x], default)
+                       for row in (grid[y] for y in self.src_y) for x in self.src_x)
+        surf = pygame.image.frombuffer(buf, (self.w, self.h), "RGB")
+        self.surface = surf.convert() if pygame.display.get_surface() is not None else surf.copy()
+        return self.surface
+
+    def tile_changed(self, x, y):
+        # solo si la celda es una de las muestreadas
+        if self.surface is None:
+            return
+        cols, rows = self.cols.get(x), self.rows.get(y)
+        if not cols or not rows:
+            return
+        color = mini_color(self.map.grid[y][x])
+        for ry in rows:
+            for rx in cols:
+                self.surface.set_at((rx, ry), color)
+        self.updates += 1
+
+    def draw(self, screen, px, py, cam_x, cam_y, view_w, view_h):
+        surf = self.surface or self.build()
+        screen.blit(surf, (px, py))
+        # rectangulo de la vista encima (no se pinta en la superficie guardada)
+        m = self.map
+        vx = int(cam_x / max(1, m.w) * self.w)
+        vy = int(cam_y / max(1, m.h) * self.h)
+        vw = max(2, int(view_w / max(1, m.w) * self.w))
+        vh = max(2, int(view_h / max(1, m.h) * self.h))
+        vw, vh = min(vw, self.w - vx), min(vh, self.h - vy)
+        pygame.draw.rect(screen, (255, 255, 255), (px + vx, py + vy, vw, vh), 1)
@@ -0,0 +1,472 @@
+import heapq
+from array import array
+from collections import OrderedDict, deque
+
+# tope del sello de generacion ('I' = 32 bits)
+_GEN_MAX = 2**32 - 1
+
+
+# buffers y ayudas comunes de los motores de busqueda (MapGrid.pathfinder)
+# trabajan sobre arrays planos: nodo = y*w + x, pasabilidad en MapGrid.passable
+# g/parent se reusan entre busquedas; seen/closed guardan la generacion
+# cada motor define search(start, goal, max_expansions=None, bounds=None), mismo
+# contrato que MapGrid.astar: camino sin start y con goal, [] si no hay;
+# bounds=(x0, y0, x1, y1) limita la busqueda a ese rectangulo (x1/y1 exclusivos)
+class Pathfinder:
+    name = "base"
+
+    def __init__(self, world_map):
+        self.map = world_map
+        self.w, self.h = world_map.w, world_map.h
+        n = self.w * self.h
+        self.g = array('i', [0]) * n
+        self.parent = array('i', [-1]) * n
+        self.seen = array('I', [0]) * n
+        self.closed = array('I', [0]) * n
+        self.gen = 0
+        # contadores acumulados
+        self.searches = 0
+        self.expanded = 0
+
+    def _next_gen(self):
+        self.gen += 1
+        if self.gen >= _GEN_MAX:
+            self._reset_stamps()
+            self.gen = 1
+        return self.gen
+
+    def _reset_stamps(self):
+        n = self.w * self.h
+        self.seen = array('I', [0]) * n
+        self.closed = array('I', [0]) * n
+
+    def _unwind(self, s, t):
+        w, parent = self.w, self.parent
+        path = []
+        c = t
+        while c != s:
+            path.append((c % w, c // w))
+            c = parent[c]
+        path.reverse()
+        return path
+
+    def _endpoints(self, start, goal, bounds):
+        # (s, t) como indices, o None si no hay nada que buscar
+        w, h = self.w, self.h
+        sx, sy = start; gx, gy = goal
+        if not (0 <= sx < w and 0 <= sy < h and 0 <= gx < w and 0 <= gy < h):
+            return None
+        if bounds is not None:
+            bx0, by0, bx1, by1 = bounds
+            if not (bx0 <= gx < bx1 and by0 <= gy < by1):
+                return None
+        s = sy*w + sx; t = gy*w + gx
+        if s == t or not self.map.passable[t]:
+            return None
+        return s, t
+
+
+# A* clasico con lista cerrada
+class GridAStar(Pathfinder):
+    name = "astar"
+
+    def search(self, start, goal, max_expansions=None, bounds=None):
+        ends = self._endpoints(start, goal, bounds)
+        if ends is None:
+            return []
+        s, t = ends
+        w, h = self.w, self.h
+        sx, sy = start; gx, gy = goal
+        if bounds is not None:
+            bx0, by0, bx1, by1 = bounds
+        passable = self.map.passable
+        self.searches += 1
+
+        gen = self._next_gen()
+        g, parent, seen, closed = self.g, self.parent, self.seen, self.closed
+        n = w * h
+        # clave entera: f, luego h (mas profundo primero), luego nodo
+        hmul = w + h + 1
+        g[s] = 0; parent[s] = -1; seen[s] = gen
+        h0 = abs(sx-gx) + abs(sy-gy)
+        openh = [(h0*hmul + h0)*n + s]
+        pop, push = heapq.heappop, heapq.heappush
+        expanded = 0
+        budget = n if max_expansions is None else max_expansions
+        found = False
+        wm1 = w - 1
+        last_row = n - w
+        while openh:
+            c = pop(openh) % n
+            if closed[c] == gen:
+                continue
+            if c == t:
+                found = True
+                break
+            closed[c] = gen
+            expanded += 1
+            if expanded > budget:
+                break
+            ng = g[c] + 1
+            x = c % w
+            # mismo orden que MapGrid.neighbors: derecha, izquierda, abajo, arriba
+            for nb in (c+1 if x < wm1 else -1, c-1 if x else -1,
+                       c+w if c < last_row else -1, c-w):
+                if nb < 0 or not passable[nb] or closed[nb] == gen:
+                    continue
+                if bounds is not None and not (bx0 <= nb % w < bx1 and by0 <= nb // w < by1):
+                    continue
+                if seen[nb] != gen or ng < g[nb]:
+                    seen[nb] = gen
+                    g[nb] = ng
+                    parent[nb] = c
+                    hh = abs(nb % w - gx) + abs(nb // w - gy)
+                    push(openh, ((ng+hh)*hmul + hh)*n + nb)
+        self.expanded += expanded
+        if not found:
+            return []
+        return self._unwind(s, t)
+
+
+# A* bidireccional: una busqueda desde cada punta, se corta cuando ninguna
+# frontera puede mejorar el mejor encuentro (mu)
+class BidirectionalAStar(Pathfinder):
+    name = "bidir"
+
+    def __init__(self, world_map):
+        super().__init__(world_map)
+        n = self.w * self.h
+        self.gb = array('i', [0]) * n
+        self.parentb = array('i', [-1]) * n
+        self.seenb = array('I', [0]) * n
+        self.closedb = array('I', [0]) * n
+
+    def _reset_stamps(self):
+        super()._reset_stamps()
+        n = self.w * self.h
+        self.seenb = array('I', [0]) * n
+        self.closedb = array('I', [0]) * n
+
+    def search(self, start, goal, max_expansions=None, bounds=None):
+        ends = self._endpoints(start, goal, bounds)
+        if ends is None:
+            return []
+        s, t = ends
+        w, h = self.w, self.h
+        n = w * h
+        sx, sy = start; gx, gy = goal
+        passable = self.map.passable
+        if bounds is not None:
+            bx0, by0, bx1, by1 = bounds
+        self.searches += 1
+        gen = self._next_gen()
+
+        # lado 0 = desde start (meta t), lado 1 = desde goal (meta s)
+        sides = (
+            (self.g, self.parent, self.seen, self.closed, gx, gy),
+            (self.gb, self.parentb, self.seenb, self.closedb, sx, sy),
+        )
+        for (g, parent, seen, _, _, _), root in zip(sides, (s, t)):
+            g[root] = 0; parent[root] = -1; seen[root] = gen
+        h0 = abs(sx-gx) + abs(sy-gy)
+        opens = ([h0*n + s], [h0*n + t])
+        pop, push = heapq.heappop, heapq.heappush
+        budget = n if max_expansions is None else max_expansions
+        expanded = 0
+        mu, meet = None, -1
+        while opens[0] and opens[1]:
+            if mu is not None and max(opens[0][0], opens[1][0]) // n >= mu:
+                break
+            side = 0 if len(opens[0]) <= len(opens[1]) else 1
+            g, parent, seen, closed, tx, ty = sides[side]
+            og, _, oseen, _, _, _ = sides[1 - side]
+            openh = opens[side]
+            c = pop(openh) % n
+            if closed[c] == gen:
+                continue
+            closed[c] = gen
+            if side == 1 and c == s:
+                continue  # start puede ser bloqueada: no se sigue por ahi
+            expanded += 1
+            if expanded > budget:
+                mu = None
+                break
+            ng = g[c] + 1
+            x = c % w; y = c // w
+            for nb, nx, ny in ((c+1, x+1, y), (c-1, x-1, y), (c+w, x, y+1), (c-w, x, y-1)):
+                if nx < 0 or nx >= w or ny < 0 or ny >= h:
+                    continue
+                if bounds is not None and not (bx0 <= nx < bx1 and by0 <= ny < by1):
+                    continue
+                if not passable[nb] and not (side == 1 and nb == s):
+                    continue
+                if closed[nb] == gen:
+                    continue
+                if seen[nb] != gen or ng < g[nb]:
+                    seen[nb] = gen
+                    g[nb] = ng
+                    parent[nb] = c
+                    push(openh, (ng + abs(nx-tx) + abs(ny-ty))*n + nb)
+                    if oseen[nb] == gen and (mu is None or ng + og[nb] < mu):
+                        mu, meet = ng + og[nb], nb
+        self.expanded += expanded
+        if mu is None:
+            return []
+        path = self._unwind(s, meet) if meet != s else []
+        c = meet
+        while c != t:
+            c = self.parentb[c]
+            path.append((c % w, c // w))
+        return path
+
+
+# Jump Point Search para 4 vecinos y costo uniforme.
+# orden canonico: primero vertical, despues horizontal. Un paso vertical se
+# comporta como la diagonal del JPS clasico (sus vecinos naturales son seguir
+# y ambos lados); uno horizontal solo sigue derecho salvo vecinos forzados
+# (arriba/abajo abiertos con la celda de atras bloqueada)
+class JumpPointSearch(Pathfinder):
+    name = "jps"
+
+    def search(self, start, goal, max_expansions=None, bounds=None):
+        ends = self._endpoints(start, goal, bounds)
+        if ends is None:
+            return []
+        s, t = ends
+        w, h = self.w, self.h
+        n = w * h
+        sx, sy = start; gx, gy = goal
+        passable = self.map.passable
+        if bounds is None:
+            bounds = (0, 0, w, h)
+        x0, y0, x1, y1 = bounds
+        self.searches += 1
+        gen = self._next_gen()
+        g, parent, seen, closed = self.g, self.parent, self.seen, self.closed
+
+        def free(x, y):
+            return x0 <= x < x1 and y0 <= y < y1 and passable[y*w + x]
+
+        def jump_h(x, y, dx):
+            # filas de arriba/abajo dentro de bounds (None si afuera)
+            row = y*w
+            up = row - w if y - 1 >= y0 else None
+            down = row + w if y + 1 < y1 else None
+            goal_row = y == gy
+            while True:
+                x += dx
+                if not (x0 <= x < x1) or not passable[row + x]:
+                    return -1
+                if goal_row and x == gx:
+                    return row + x
+                back = x - dx
+                back_in = x0 <= back < x1
+                if up is not None and passable[up + x] and not (back_in and passable[up + back]):
+                    return row + x
+                if down is not None and passable[down + x] and not (back_in and passable[down + back]):
+                    return row + x
+
+        def jump_v(x, y, dy):
+            while True:
+                y += dy
+                if not free(x, y):
+                    return -1
+                if x == gx and y == gy:
+                    return y*w + x
+                if jump_h(x, y, 1) >= 0 or jump_h(x, y, -1) >= 0:
+                    return y*w + x
+
+        g[s] = 0; parent[s] = -1; seen[s] = gen
+        openh = [(abs(sx-gx) + abs(sy-gy))*n + s]
+        pop, push = heapq.heappop, heapq.heappush
+        budget = n if max_expansions is None else max_expansions
+        expanded = 0
+        found = False
+        while openh:
+            c = pop(openh) % n
+            if closed[c] == gen:
+                continue
+            if c == t:
+                found = True
+                break
+            closed[c] = gen
+            expanded += 1
+            if expanded > budget:
+                break
+            x, y = c % w, c // w
+            p = parent[c]
+            if p < 0:
+                dirs = ((1, 0), (-1, 0), (0, 1), (0, -1))
+            else:
+                px, py = p % w, p // w
+                dx = (x > px) - (x < px)
+                dy = (y > py) - (y < py)
+                if dx:
+                    dirs = [(dx, 0)]
+                    if free(x, y-1) and not free(x-dx, y-1): dirs.append((0, -1))
+                    if free(x, y+1) and not free(x-dx, y+1): dirs.append((0, 1))
+                else:
+                    dirs = ((0, dy), (1, 0), (-1, 0))
+            for dx, dy in dirs:
+                j = jump_h(x, y, dx) if dx else jump_v(x, y, dy)
+                if j < 0 or closed[j] == gen:
+                    continue
+                jx, jy = j % w, j // w
+                ng = g[c] + abs(jx-x) + abs(jy-y)
+                if seen[j] != gen or ng < g[j]:
+                    seen[j] = gen
+                    g[j] = ng
+                    parent[j] = c
+                    push(openh, (ng + abs(jx-gx) + abs(jy-gy))*n + j)
+        self.expanded += expanded
+        if not found:
+            return []
+        # unir los saltos en pasos de a una celda
+        jumps = [t]
+        while jumps[-1] != s:
+            jumps.append(parent[jumps[-1]])
+        jumps.reverse()
+        path = []
+        for a, b in zip(jumps, jumps[1:]):
+            ax, ay, bx, by = a % w, a // w, b % w, b // w
+            dx = (bx > ax) - (bx < ax)
+            dy = (by > ay) - (by < ay)
+            while (ax, ay) != (bx, by):
+                ax += dx; ay += dy
+                path.append((ax, ay))
+        return path
+
+
+# motores disponibles por nombre (MapGrid(pathfinder=...))
+PATHFINDERS = {cls.name: cls for cls in (GridAStar, BidirectionalAStar, JumpPointSearch)}
+
+# camino que se refina por tramos a medida que se consume
+# imita lo que los actores usan de deque: [0], popleft, clear, len, bool
+class LazyPath:
+    def __init__(self, legs, refine, fallback):
+        # legs: [(a, b, costo)] en tiles; refine(a, b) -> tiles de a (excl.) a b (incl.)
+        self._legs = deque(legs)
+        self._refine = refine
+        self._fallback = fallback
+        self._buf = deque()
+        self._left = sum(c for _, _, c in legs)
+
+    def _fill(self, everything=False):
+        while self._legs and (everything or not self._buf):
+            a, b, cost = self._legs.popleft()
+            steps = self._refine(a, b)
+            if len(steps) != cost:
+                # el mapa cambio desde la consulta: rehacer plano hasta el final
+                goal = self._legs[-1][1] if self._legs else b
+                steps = self._fallback(a, goal)
+                self._legs.clear()
+                self._left = len(steps)
+            self._buf.extend(steps)
+        if not self._buf:
+            self._left = 0
+
+    def __len__(self):
+        return self._left
+
+    def __bool__(self):
+        return self._left > 0
+
+    def __getitem__(self, k):
+        if k != 0:
+            raise IndexError("LazyPath solo expone el siguiente paso")
+        self._fill()
+        if not self._buf:
+            raise IndexError("camino vacio")
+        return self._buf[0]
+
+    def popleft(self):
+        self._fill()
+        if not self._buf:
+            raise IndexError("camino vacio")
+        self._left -= 1
+        return self._buf.popleft()
+
+    def clear(self):
+        self._legs.clear()
+        self._buf.clear()
+        self._left = 0
+
+    def __iter__(self):
+        # refina todo lo que falta (para depurar / medir), sin consumir
+        self._fill(everything=True)
+        return iter(list(self._buf))
+
+
+def as_path(path):
+    # lo que guardan los actores: LazyPath tal cual, listas como deque
+    return path if isinstance(path, LazyPath) else deque(path)
+
+
+# cache LRU de caminos (start, goal) -> camino, validado por revision del mapa
+# el mapa se parte en sectores; cerrar una celda solo invalida los caminos que
+# pasan por su sector. Abrir una celda puede acortar cualquier camino: invalida todo
+class PathCache:
+    def __init__(self, w, h, capacity=2048, sector=16):
+        self.capacity = capacity
+        self.sector = sector
+        self.sw = (w + sector - 1) // sector
+        self.sector_rev = [0] * (self.sw * ((h + sector - 1) // sector))
+        self.open_rev = 0
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def _sector(self, x, y):
+        return (y // self.sector) * self.sw + (x // self.sector)
+
+    def get(self, start, goal):
+        key = (start, goal)
+        e = self.entries.get(key)
+        if e is None:
+            self.misses += 1
+            return None
+        path, rev, sectors = e
+        if rev < self.open_rev or any(self.sector_rev[s] > rev for s in sectors):
+            del self.entries[key]
+            self.invalidations += 1
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return list(path)
+
+    def put(self, start, goal, path, rev):
+        if not path or self.capacity <= 0:
+            return
+        sectors = {self._sector(x, y) for (x, y) in path}
+        sectors.add(self._sector(*start))
+        key = (start, goal)
+        self.entries[key] = (tuple(path), rev, tuple(sectors))
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.capacity:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def tile_changed(self, x, y, rev, opened):
+        # solo cambios de paso importan
+        if opened:
+            self.open_rev = rev
+        else:
+            self.sector_rev[self._sector(x, y)] = rev
+
+    def clear(self):
+        self.entries.clear()
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "size": len(self.entries),
+            "capacity": self.capacity,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
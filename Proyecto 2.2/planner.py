@@ -1,6 +1,8 @@
 import heapq
+from itertools import chain
 from world import FOREST, MINE, FARM, GRANARY, HOME
-from actors import SUIT_MAP
+from actors import SUIT_MAP, SPEED_MULT, WORK_TIMES
+from matching import assign
 
 PRIORITIES = {
     "idle":        0,
@@ -22,34 +24,239 @@ TASK_TO_TILE = {
     "defend": HOME,
 }
 
+# "matching": todos los enanos libres contra todas las tareas de una prioridad a la vez
+# (costo minimo con distancias baratas, despues un solo camino por asignacion)
+# "greedy": tarea por tarea, probando caminos enano por enano
+ASSIGN_MODE = "matching"
+
+# tareas con posicion propia: cada una es su propio grupo
+POSITIONAL = ("build_at", "heal")
+
+
+def _work_cost(d, task):
+    # mismo calculo que DwarfBase.current_work_time
+    base = WORK_TIMES.get(task, 12)
+    mult = SPEED_MULT["match"] if task in SUIT_MAP.get(d.oficio, set()) else SPEED_MULT["mismatch"]
+    return int(max(6, base * mult))
+
+
+# tareas idempotentes: tarea -> campo del payload que la identifica
+# repetir la orden no suma otra, se junta con la que ya esta (y puede subir de prioridad)
+DEDUP_FIELDS = {
+    "heal":     "dwarf",
+    "build_at": "pos",
+}
+
+
+def _hashable(v):
+    return tuple(v) if isinstance(v, list) else v
+
+
+def _payload_key(payload):
+    # mismo payload -> misma clave (listas como tuplas; el resto tiene que ser hasheable)
+    return tuple(sorted((k, _hashable(v)) for k, v in payload.items()))
+
+
+def dedup_key(task, payload):
+    # (tarea, enano/posicion) o None si la tarea no es idempotente
+    field = DEDUP_FIELDS.get(task)
+    if field is None or (payload or {}).get(field) is None:
+        return None
+    return (task, _hashable(payload[field]))
+
+
+class TaskBucket:
+    # una orden: tarea + payload con cuantas unidades faltan (handle para cancelar/ajustar)
+    def __init__(self, priority, ticket, task, payload, count, key):
+        self.priority = priority
+        self.ticket = ticket
+        self.task = task
+        self.payload = payload
+        self.count = count
+        self.key = key
+
+
 class HeapPriority:
+    # heap de (-prioridad, ticket, bucket); una entrada por (prioridad, tarea, payload)
+    # "juntar 500 madera" es un bucket con count=500, no 500 entradas
     def __init__(self):
         self.data = []
+        # clave -> bucket vivo (esten o no en el heap en este momento)
+        self.buckets = {}
+    def __len__(self):
+        return len(self.buckets)
+
+    def units(self):
+        return sum(b.count for b in self.buckets.values())
+
+    def push(self, bucket):
+        self.buckets[bucket.key] = bucket
+        heapq.heappush(self.data, (-bucket.priority, bucket.ticket, bucket))
+
+    def get(self, key):
+        return self.buckets.get(key)
+
+    def bump(self, bucket, priority):
+        # entrada nueva con la prioridad nueva; la vieja queda vencida
+        bucket.priority = priority
+        heapq.heappush(self.data, (-priority, bucket.ticket, bucket))
+
+    def _alive(self, bucket):
+        return bucket.count > 0 and self.buckets.get(bucket.key) is bucket
+
+    def top(self):
+        # los cancelados/vacios (o con prioridad vieja) salen recien cuando asoman
+        data = self.data
+        while data and (not self._alive(data[0][2]) or -data[0][0] != data[0][2].priority):
+            heapq.heappop(data)
+        return data[0][2] if data else None
+
+    def pop(self):
+        self.top()
+        return heapq.heappop(self.data)[2]
+
+    def restore(self, bucket):
+        # vuelve al heap si le queda algo; si no, se olvida
+        if self._alive(bucket):
+            heapq.heappush(self.data, (-bucket.priority, bucket.ticket, bucket))
+        elif self.buckets.get(bucket.key) is bucket:
+            del self.buckets[bucket.key]
+
+    def remove(self, bucket):
+        bucket.count = 0
+        if self.buckets.get(bucket.key) is bucket:
+            del self.buckets[bucket.key]
+
+# oficios que hacen mejor cada tarea (especialistas)
+SPECIALISTS = {}
+for _oficio, _tasks in SUIT_MAP.items():
+    for _task in _tasks:
+        SPECIALISTS.setdefault(_task, set()).add(_oficio)
+
+
+class IdlePools:
+    # enanos libres separados por (oficio, manual_hold): pedir especialistas o
+    # generalistas no recorre a todos; dentro del pool se elige por la energia
+    # actual (la de un libre cambia sola: curacion, ataques, tope de 100)
+    def __init__(self):
+        self.pools = {}
+        # enano -> clave del pool; dict con orden estable
+        self.where = {}
+
     def __len__(self):
-        return len(self.data)
+        return len(self.where)
+
+    def __contains__(self, d):
+        return d in self.where
+
+    def __iter__(self):
+        return iter(self.where)
+
+    def add(self, d):
+        # True si es nuevo; si cambio de pool (manual_hold) se mueve
+        key = (d.oficio, bool(d.manual_hold))
+        cur = self.where.get(d)
+        if cur == key:
+            return False
+        if cur is not None:
+            self.pools[cur].pop(d, None)
+        self.where[d] = key
+        self.pools.setdefault(key, {})[d] = None
+        return cur is None
+
+    def discard(self, d):
+        key = self.where.pop(d, None)
+        if key is not None:
+            self.pools[key].pop(d, None)
+
+    def _select(self, oficios, hold, exclude):
+        # libres de esos oficios (o de los demas si exclude)
+        for (oficio, held), pool in self.pools.items():
+            if held and not hold:
+                continue
+            if oficios is not None and (oficio in oficios) == exclude:
+                continue
+            yield from pool
+
+    def by_energy(self, oficios=None, hold=False, exclude=False):
+        # de mas a menos energia
+        return sorted(self._select(oficios, hold, exclude), key=lambda d: d.energy, reverse=True)
+
 
 class Planner:
-    def __init__(self, game):
+    def __init__(self, game, mode=ASSIGN_MODE):
         self.game = game
         self.heap = HeapPriority()
         # romper empates hear
         self._ticket = 0
+        self.mode = mode
+        # solo se reparte cuando algo cambio: tarea nueva, enano libre, mapa
+        self.dirty = True
+        # enanos libres por oficio/energia; los actualiza note() (aviso de DwarfBase)
+        self.idle = IdlePools()
+        self._roster = (-1, -1)
+        game.map.tile_listeners.append(self._map_changed)
+
+    def wake(self):
+        self.dirty = True
+
+    def _map_changed(self, x, y):
+        self.dirty = True
+
+    def note(self, d):
+        # el enano cambio de tarea/estado/energia/manual_hold: entra o sale de los libres
+        d.on_state_change = self.note
+        if d.task == "idle" and d.state != "Muerto" and d.energy > 0:
+            if self.idle.add(d):
+                self.dirty = True
+        else:
+            self.idle.discard(d)
 
-    def _push_heapitem(self, priority, task, payload):
+    def _sync_roster(self):
+        # enanos/llamas agregados desde afuera (teclado, scripts): se revisan todos
+        game = self.game
+        roster = (len(game.dwarves), len(game.llamas))
+        if roster != self._roster:
+            self._roster = roster
+            for d in game.dwarves:
+                self.note(d)
+            self.dirty = True
+
+    def _push_heapitem(self, priority, task, payload, amount=1):
         #priority más grande=más important
+        # devuelve (bucket, cambio): cambio=False si la orden ya estaba igual
+        payload = payload or {}
+        dkey = dedup_key(task, payload)
+        key = dkey or (priority, task, _payload_key(payload))
+        bucket = self.heap.get(key)
+        if bucket is not None and dkey is not None:
+            # ya pedida: se junta, a lo sumo sube de prioridad
+            changed = amount > bucket.count
+            bucket.count = max(bucket.count, amount)
+            if priority > bucket.priority:
+                self.heap.bump(bucket, priority)
+                changed = True
+            return bucket, changed
+        if bucket is not None:
+            # misma orden ya en cola: solo suma unidades
+            bucket.count += amount
+            return bucket, True
         self._ticket += 1
-        # heapq es min-heap
-        heapq.heappush(
-            self.heap.data,
-            (-priority, self._ticket, task, payload or {})
-        )
+        bucket = TaskBucket(priority, self._ticket, task, payload, amount, key)
+        self.heap.push(bucket)
+        return bucket, True
 
     def push_action(self, task, amount=1, base_priority=None, payload=None):
+        # devuelve el bucket (handle para cancel/adjust)
         pr = PRIORITIES.get(task, 1)
         if base_priority is not None:
             pr = base_priority
-        for _ in range(amount):
-            self._push_heapitem(pr, task, payload)
+        bucket = None
+        if amount > 0:
+            bucket, changed = self._push_heapitem(pr, task, payload, amount)
+            # repetir una orden idempotente no despierta al planner
+            if changed:
+                self.dirty = True
 
         #defensa es inmediata
         if task == "defend":
@@ -57,137 +264,319 @@ class Planner:
                 if d.state != "Muerto":
                     d.cancel_task()
                     d.defend()
+                    self.note(d)
+            self._assign()
+        return bucket
+
+    def pending(self, task, ident):
+        # orden idempotente ya en cola (heal por enano, build_at por posicion)
+        bucket = self.heap.get((task, _hashable(ident)))
+        return bucket if bucket is not None and bucket.count > 0 else None
+
+    def cancel(self, bucket):
+        self.heap.remove(bucket)
+
+    def adjust(self, bucket, amount):
+        # cambia cuantas unidades faltan; 0 cancela
+        if amount <= 0:
+            self.cancel(bucket)
+            return
+        if self.heap.buckets.get(bucket.key) is not bucket:
+            return
+        if amount > bucket.count:
+            self.dirty = True
+        bucket.count = amount
+
+    def _assign(self):
+        if self.mode == "greedy":
             self._assign_until_blocked()
+        else:
+            self._assign_matching()
 
     def _assign_until_blocked(self):
 
         assigned_something = True
 
-        while assigned_something and self.heap.data:
+        while assigned_something and self.heap.top():
             assigned_something = False
-            new_buffer = []
 
             round_items = []
-            while self.heap.data:
-                round_items.append(heapq.heappop(self.heap.data))
-
-            for pr_neg, ticket, task, payload in round_items:
-                payload = payload or {}
-                force = payload.get("force", False)
+            while self.heap.top():
+                round_items.append(self.heap.pop())
 
+            for bucket in round_items:
                 if getattr(self.game, "defense_mode", False):
-                    if task not in ("defend", "heal"):
-                        new_buffer.append((pr_neg, ticket, task, payload))
+                    if bucket.task not in ("defend", "heal"):
                         continue
+                # orden por energia una vez por balde: en una pasada la energia no cambia
+                payload = bucket.payload or {}
+                specialists, generalists = self._candidates(bucket.task, payload)
+                while bucket.count > 0 and self._assign_one(bucket.task, payload, specialists, generalists):
+                    bucket.count -= 1
+                    assigned_something = True
+
+            # re encolar
+            for bucket in round_items:
+                self.heap.restore(bucket)
+
+    def _candidates(self, task, payload):
+        # (especialistas, generalistas) libres, de mas a menos energia actual
+        hold = task in ("defend", "heal") or payload.get("force", False)
+        owner = payload.get("dwarf")
+        if owner is not None:
+            # orden para un enano puntual (heal)
+            if owner not in self.idle or (owner.manual_hold and not hold):
+                return [], []
+            return [], [owner]
+        oficios = SPECIALISTS.get(task, set())
+        return self.idle.by_energy(oficios, hold), self.idle.by_energy(oficios, hold, exclude=True)
+
+    def _assign_one(self, task, payload, specialists, generalists):
+        # el asignado sale de su lista: las siguientes unidades no lo miran
+        best_dwarf_assigned = None
+        if task in ("build_at", "heal"):
+            pos = payload.get("pos")
+            if not pos:
+                return None
+
+            # primero especialist
+            for d in chain(specialists, generalists):
+                path = self.game.map.astar((d.x, d.y), pos)
+                if path:
+                    best_dwarf_assigned = d
+                    best_dwarf_assigned.assign_task(task, path, priority=PRIORITIES.get(task, 1), meta=payload)
+                    break
+
+        # cazar
+        elif task == "hunt":
+            live_llamas = [llama for llama in self.game.llamas if llama.hp > 0]
+            if not live_llamas:
+                return None
 
+            #cercana: una sola BFS desde todas las llamas ordena a los enanos
+            targets = {}
+            for llama in live_llamas:
+                targets.setdefault((int(llama.x), int(llama.y)), llama)
+            hunters = specialists + generalists
+            ranking = self.game.map.rank_to_targets([(d.x, d.y) for d in hunters], targets)
 
-                raw_idle = [
-                    d for d in self.game.dwarves
-                    if d.task == "idle" and d.state != "Muerto" and d.energy > 0
-                ]
-                
-                if task in ("defend", "heal") or force:
-                    idle_dwarves = raw_idle[:]
-                else:
-                    idle_dwarves = [d for d in raw_idle if not d.manual_hold]
+            #prim caz, despues gen (k < len(specialists) son cazadores)
+            ranking.sort(key=lambda r: (r[1] >= len(specialists), r[0], r[1]))
+            best_target, best_path = None, []
+            for dist, k, goal in ranking:
+                path = self.game.map.astar((hunters[k].x, hunters[k].y), goal)
+                if path:
+                    best_dwarf_assigned = hunters[k]
+                    best_target = targets[goal]
+                    best_path = path
+                    break
 
-                if not idle_dwarves:
-                    new_buffer.append((pr_neg, ticket, task, payload))
+            if best_dwarf_assigned:
+                best_dwarf_assigned.assign_task(task, best_path, priority=PRIORITIES.get(task, 1), meta={"target": best_target})
+
+        # Tareas
+        elif TASK_TO_TILE.get(task):
+            tile = TASK_TO_TILE.get(task)
+
+            #prim especialistas luego gen
+            for d in chain(specialists, generalists):
+                goal, path = self.game.find_nearest(d, tile)
+                if goal:
+                    best_dwarf_assigned = d
+                    best_dwarf_assigned.assign_task(task, path, priority=PRIORITIES.get(task, 1))
+                    break
+
+        # una orden manual mas fuerte ignora la tarea
+        if best_dwarf_assigned is None or best_dwarf_assigned.task != task:
+            return None
+        best_dwarf_assigned.manual_hold = False
+        for group in (specialists, generalists):
+            if best_dwarf_assigned in group:
+                group.remove(best_dwarf_assigned)
+        return best_dwarf_assigned
+
+    def _assign_matching(self):
+        game = self.game
+        heap = self.heap
+        for d in list(self.idle):
+            self.note(d)
+        free = list(self.idle)
+        popped = []
+
+        # por prioridad: primero se reparten las mas importantes; sin enanos
+        # libres se corta ahi y el resto del heap ni se toca
+        while free and heap.top():
+            pr = heap.top().priority
+            tier = []
+            while heap.top() and heap.top().priority == pr:
+                tier.append(heap.pop())
+            popped.extend(tier)
+            if getattr(game, "defense_mode", False):
+                tier = [b for b in tier if b.task in ("defend", "heal")]
+            if tier:
+                self._match_tier(tier, free)
+
+        for bucket in popped:
+            heap.restore(bucket)
+
+    def _match_tier(self, tier, free):
+        # agrupa ordenes iguales (cupo = unidades que faltan), arma la matriz
+        # enanos x grupos, resuelve y recien ahi busca un camino por asignacion
+        groups = {}
+        for bucket in tier:
+            task, payload = bucket.task, bucket.payload
+            owner = payload.get("dwarf")
+            if owner is not None and owner.state == "Muerto":
+                # curar a alguien que ya murio
+                self.heap.remove(bucket)
+                continue
+            if task in POSITIONAL:
+                if not payload.get("pos"):
                     continue
+                key = bucket.key
+            elif task == "hunt" or TASK_TO_TILE.get(task):
+                key = (task, payload.get("force", False))
+            else:
+                continue
+            groups.setdefault(key, []).append(bucket)
+        if not groups:
+            return
 
-                specialists = []
-                generalists = []
-                for d in idle_dwarves:
-                    if task in SUIT_MAP.get(d.oficio, set()):
-                        specialists.append(d)
-                    else:
-                        generalists.append(d)
-                
-
-                specialists.sort(key=lambda d: d.energy, reverse=True)
-                generalists.sort(key=lambda d: d.energy, reverse=True)
-
-                best_dwarf_assigned = None
-                if task in ("build_at", "heal"):
-                    pos = payload.get("pos")
-                    if not pos:
-                        new_buffer.append((pr_neg, ticket, task, payload)); continue
-
-                    # primero especialist
-                    for d in specialists + generalists:
-                        path = self.game.map.astar((d.x, d.y), pos)
-                        if path:
-                            best_dwarf_assigned = d
-                            best_dwarf_assigned.assign_task(task, path, priority=PRIORITIES.get(task, 1), meta=payload)
-                            break
-                
-                # cazar
-                elif task == "hunt":
-                    live_llamas = [llama for llama in self.game.llamas if llama.hp > 0]
-                    if not live_llamas:
-                        new_buffer.append((pr_neg, ticket, task, payload)); continue
-
-                    #cercana
-                    best_target, best_path, best_score = None, [], 10**9
-                    
-                    #prim caz
-                    for d in specialists:
-                        for llama in live_llamas:
-                            path = self.game.map.astar((d.x, d.y), (int(llama.x), int(llama.y)))
-                            if path and len(path) < best_score:
-                                best_dwarf_assigned = d
-                                best_target = llama
-                                best_path = path
-                                best_score = len(path)
-                    
-                    # gen
-                    if best_dwarf_assigned is None:
-                         for d in generalists:
-                            for llama in live_llamas:
-                                path = self.game.map.astar((d.x, d.y), (int(llama.x), int(llama.y)))
-                                if path and len(path) < best_score:
-                                    best_dwarf_assigned = d
-                                    best_target = llama
-                                    best_path = path
-                                    best_score = len(path)
-
-                    if best_dwarf_assigned:
-                        best_dwarf_assigned.assign_task(task, best_path, priority=PRIORITIES.get(task, 1), meta={"target": best_target})
-                
-                # Tareas
-                elif TASK_TO_TILE.get(task):
-                    tile = TASK_TO_TILE.get(task)
-                    
-                    #prim especialistas luego vida
-                    for d in specialists:
-                        goal, path = self.game.find_nearest(d, tile)
-                        if path and goal:
-                            best_dwarf_assigned = d
-                            best_dwarf_assigned.assign_task(task, path, priority=PRIORITIES.get(task, 1))
-                            break
-                    
-                    # gen
-                    if best_dwarf_assigned is None:
-                        for d in generalists:
-                            goal, path = self.game.find_nearest(d, tile)
-                            if path and goal:
-                                best_dwarf_assigned = d
-                                best_dwarf_assigned.assign_task(task, path, priority=PRIORITIES.get(task, 1))
-                                break 
-
-                
-
-                if best_dwarf_assigned:
-                    best_dwarf_assigned.manual_hold = False
-                    assigned_something = True
-                else:
-                    #nadie -> cola
-                    new_buffer.append((pr_neg, ticket, task, payload))
+        keys = list(groups)
+        cost = [[None] * len(keys) for _ in free]
+        index = {d: i for i, d in enumerate(free)}
+        targets = {}
+        for j, key in enumerate(keys):
+            first = groups[key][0]
+            task, payload = first.task, first.payload
+            urgent = task in ("defend", "heal") or payload.get("force", False)
+            owner = payload.get("dwarf")
+            if owner is not None:
+                # solo ese enano la puede tomar
+                rows = [index[owner]] if owner in index else []
+                steps = dict(zip(rows, self._estimate(task, payload, [owner] * len(rows), targets)))
+            else:
+                rows = range(len(free))
+                steps = self._estimate(task, payload, free, targets)
+            for i in rows:
+                d = free[i]
+                s = steps[i]
+                if s is None or (d.manual_hold and not urgent):
+                    continue
+                # empate: mas energia primero (como el greedy)
+                cost[i][j] = (s + _work_cost(d, task)) * 1000 - int(d.energy * 4)
 
-            # re encolar
-            for item in new_buffer:
-                heapq.heappush(self.heap.data, item)
+        match = assign(cost, [sum(b.count for b in groups[key]) for key in keys])
+        by_group = {}
+        for i, j in match.items():
+            by_group.setdefault(j, []).append(i)
+
+        used = set()
+        for j, key in enumerate(keys):
+            # las ordenes mas viejas primero, a los enanos mas baratos
+            buckets = sorted(groups[key], key=lambda b: b.ticket)
+            rows = sorted(by_group.get(j, ()), key=lambda i: cost[i][j])
+            k = 0
+            for i in rows:
+                while k < len(buckets) and buckets[k].count <= 0:
+                    k += 1
+                if k >= len(buckets):
+                    break
+                b = buckets[k]
+                if self._start(free[i], b.task, b.payload, targets):
+                    b.count -= 1
+                    used.add(i)
+        free[:] = [d for i, d in enumerate(free) if i not in used]
+
+    def _estimate(self, task, payload, dwarves, targets):
+        # pasos aproximados de cada enano a la tarea, None si no llega (sin A* ni BFS):
+        # recursos por su campo de distancias, el resto manhattan a la meta alcanzable
+        game = self.game
+        m = game.map
+        if task == "hunt":
+            return self._hunt_steps(dwarves, targets)
+        if task in POSITIONAL:
+            goals = {tuple(payload["pos"]): None}
+        else:
+            tile = TASK_TO_TILE[task]
+            field = m.fields.get(tile)
+            if field is not None:
+                return [self._field_steps(field, d) for d in dwarves]
+            goals = dict.fromkeys(m.positions_for(tile))
+        steps = []
+        for d in dwarves:
+            best = None
+            for goal in goals:
+                dist = abs(d.x - goal[0]) + abs(d.y - goal[1])
+                if (best is None or dist < best[0]) and m.reachable((d.x, d.y), goal):
+                    best = (dist, goal)
+            if best is None:
+                steps.append(None)
+                continue
+            steps.append(best[0])
+        return steps
+
+    def _hunt_steps(self, dwarves, targets):
+        # la llama viva alcanzable mas cercana a cada enano, por anillos del indice
+        m = self.game.map
+        index = self.game.llama_index
+        steps = []
+        for d in dwarves:
+            start = (d.x, d.y)
+            llama = index.nearest(d.x, d.y, lambda l: l.hp > 0 and m.reachable(start, index.pos[l]))
+            if llama is None:
+                steps.append(None)
+                continue
+            goal = index.pos[llama]
+            steps.append(abs(d.x - goal[0]) + abs(d.y - goal[1]))
+            targets[d] = (goal, llama)
+        return steps
+
+    def _field_steps(self, field, d):
+        if not (0 <= d.x < field.w and 0 <= d.y < field.h):
+            return None
+        i = d.y * field.w + d.x
+        s = field.dist[i]
+        if s >= 0:
+            return s
+        # parado en celda bloqueada: sale por un vecino
+        if field.map.passable[i]:
+            return None
+        s, _ = field._best_neighbor(i)
+        return s + 1 if s >= 0 else None
+
+    def _start(self, d, task, payload, targets):
+        # camino real solo para la asignacion elegida
+        pr = PRIORITIES.get(task, 1)
+        if task in POSITIONAL:
+            path = self.game.map.astar((d.x, d.y), payload["pos"])
+            if not path:
+                return False
+            d.assign_task(task, path, priority=pr, meta=payload)
+        elif task == "hunt":
+            if d not in targets:
+                return False
+            goal, llama = targets[d]
+            path = self.game.map.astar((d.x, d.y), goal)
+            if not path:
+                return False
+            d.assign_task(task, path, priority=pr, meta={"target": llama})
+        else:
+            goal, path = self.game.find_nearest(d, TASK_TO_TILE[task])
+            if not goal:
+                return False
+            d.assign_task(task, path, priority=pr)
+        # una orden manual mas fuerte ignora la tarea
+        if d.task != task:
+            return False
+        d.manual_hold = False
+        self.idle.discard(d)
+        return True
 
     def update(self):
-        if self.heap.data:
-            self._assign_until_blocked()
+        self._sync_roster()
+        if not self.dirty:
+            return
+        self.dirty = False
+        if self.heap:
+            self._assign()
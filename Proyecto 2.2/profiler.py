@@ -0,0 +1,150 @@
+# medicion por subsistema (planner, oleadas, ponchos, torres, dibujo, panel...)
+#   with PROFILER.section("draw.map"): ...     tiempo del bloque
+#   PROFILER.count("poncho.repath")            contador del frame
+#   PROFILER.end_frame()                       cierra el frame (ventana movil)
+# apagado (enabled=False) section devuelve un bloque vacio y count no hace nada
+import json, os, time
+
+perf_ns = time.perf_counter_ns
+
+# frames en la ventana movil del resumen
+WINDOW = 120
+# tope de eventos guardados mientras se graba una traza
+TRACE_MAX = 500_000
+
+
+class _Off:
+    # bloque que no mide nada (profiler apagado)
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_OFF = _Off()
+
+
+class _Section:
+    __slots__ = ("prof", "name", "t0")
+
+    def __init__(self, prof, name):
+        self.prof = prof
+        self.name = name
+
+    def __enter__(self):
+        self.t0 = perf_ns()
+        return self
+
+    def __exit__(self, *exc):
+        self.prof._add(self.name, self.t0, perf_ns())
+        return False
+
+
+class Profiler:
+    def __init__(self, window=WINDOW):
+        self.enabled = False
+        self.window = window
+        # frame en curso: nombre -> ns acumulados / cuenta
+        self.times = {}
+        self.counters = {}
+        # ultimos `window` frames: nombre -> lista circular
+        self.hist_times = {}
+        self.hist_counts = {}
+        self.frames = 0
+        # traza tipo Chrome (chrome://tracing, Perfetto) mientras tracing=True
+        self.tracing = False
+        self.trace = []
+        self.t_origin = perf_ns()
+
+    def section(self, name):
+        if not self.enabled:
+            return _OFF
+        return _Section(self, name)
+
+    def count(self, name, n=1):
+        if self.enabled:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def _add(self, name, t0, t1):
+        self.times[name] = self.times.get(name, 0) + (t1 - t0)
+        if self.tracing and len(self.trace) < TRACE_MAX:
+            self.trace.append((name, t0, t1 - t0))
+
+    def end_frame(self):
+        if not self.enabled:
+            return
+        slot = self.frames % self.window
+        self.frames += 1
+        for hist, cur in ((self.hist_times, self.times), (self.hist_counts, self.counters)):
+            for name in cur:
+                if name not in hist:
+                    hist[name] = [0] * self.window
+            # lo que no corrio este frame cuenta 0
+            for name, row in hist.items():
+                row[slot] = cur.get(name, 0)
+        if self.tracing and self.counters and len(self.trace) < TRACE_MAX:
+            self.trace.append((None, perf_ns(), dict(self.counters)))
+        self.times = {}
+        self.counters = {}
+
+    def set_enabled(self, on):
+        self.enabled = on
+        if not on:
+            self.times, self.counters = {}, {}
+
+    def reset(self):
+        self.times, self.counters = {}, {}
+        self.hist_times, self.hist_counts = {}, {}
+        self.frames = 0
+
+    def summary(self):
+        # [(nombre, promedio ms, maximo ms)] de la ventana, mas lento primero,
+        # y {contador: promedio por frame}
+        n = max(1, min(self.frames, self.window))
+        rows = []
+        for name, row in self.hist_times.items():
+            rows.append((name, sum(row) / n / 1e6, max(row) / 1e6))
+        rows.sort(key=lambda r: -r[1])
+        counts = {name: sum(row) / n for name, row in self.hist_counts.items()}
+        return rows, counts
+
+    # trazas
+    def start_trace(self):
+        self.trace = []
+        self.tracing = True
+
+    def stop_trace(self):
+        self.tracing = False
+
+    def dump_trace(self, path):
+        # formato Trace Event de Chrome: eventos completos (X) y contadores (C)
+        events = []
+        for name, t, v in self.trace:
+            ts = (t - self.t_origin) / 1000
+            if name is None:
+                events.append({"name": "contadores", "ph": "C", "ts": ts,
+                               "pid": os.getpid(), "tid": 0, "args": v})
+            else:
+                events.append({"name": name, "cat": name.split(".")[0], "ph": "X",
+                               "ts": ts, "dur": v / 1000, "pid": os.getpid(), "tid": 0})
+        with open(path, "w") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+        return len(events)
+
+    def dump_summary(self, path):
+        rows, counts = self.summary()
+        doc = {
+            "frames": min(self.frames, self.window),
+            "sections": {name: {"avg_ms": round(avg, 4), "max_ms": round(mx, 4)}
+                         for name, avg, mx in rows},
+            "counters": {name: round(v, 3) for name, v in counts.items()},
+        }
+        with open(path, "w") as f:
+            json.dump(doc, f, indent=2)
+
+
+# unico profiler del juego
+PROFILER = Profiler()
@@ -0,0 +1,182 @@
+from array import array
+from collections import deque
+
+
+# etiquetas de componentes conexas sobre celdas pasables (-1 = bloqueada)
+# dos celdas con la misma etiqueta se conectan; si no, A* ni se intenta
+class RegionLabels:
+    def __init__(self, world_map):
+        self.map = world_map
+        self.w, self.h = world_map.w, world_map.h
+        self.rebuild()
+
+    def _nbrs(self, i):
+        w = self.w
+        x = i % w
+        out = []
+        if x + 1 < w: out.append(i + 1)
+        if x > 0: out.append(i - 1)
+        if i + w < w*self.h: out.append(i + w)
+        if i >= w: out.append(i - w)
+        return out
+
+    def _new_label(self):
+        self._next += 1
+        return self._next
+
+    def rebuild(self):
+        n = self.w * self.h
+        self.label = array('i', [-1]) * n
+        self.size = {}
+        self._next = 0
+        passable = self.map.passable
+        for i in range(n):
+            if passable[i] and self.label[i] < 0:
+                lab = self._new_label()
+                self.size[lab] = self._flood(i, lab)
+
+    def _flood(self, seed, lab):
+        # pinta con lab todo lo pasable alcanzable desde seed
+        label, passable = self.label, self.map.passable
+        label[seed] = lab
+        q = deque([seed])
+        count = 1
+        while q:
+            c = q.popleft()
+            for nb in self._nbrs(c):
+                if passable[nb] and label[nb] != lab:
+                    label[nb] = lab
+                    q.append(nb)
+                    count += 1
+        return count
+
+    def refresh(self, i, was_passable):
+        now = self.map.passable[i]
+        if bool(was_passable) == bool(now):
+            return
+        if now:
+            self._opened(i)
+        else:
+            self._closed(i)
+
+    def _opened(self, i):
+        label = self.label
+        labs = {label[nb] for nb in self._nbrs(i) if label[nb] >= 0}
+        if not labs:
+            lab = self._new_label()
+            label[i] = lab
+            self.size[lab] = 1
+            return
+        # une componentes: la mas grande se queda, las otras se repintan
+        big = max(labs, key=lambda l: self.size[l])
+        total = sum(self.size.pop(l) for l in labs) + 1
+        if len(labs) == 1:
+            label[i] = big
+        else:
+            self._flood(i, big)
+        self.size[big] = total
+
+    def _ring_connected(self, i):
+        # prueba local: los vecinos pasables siguen unidos rodeando i?
+        w, h, passable = self.w, self.h, self.map.passable
+        x, y = i % w, i // w
+
+        def ok(cx, cy):
+            return 0 <= cx < w and 0 <= cy < h and passable[cy*w + cx]
+
+        ring = [ok(x, y-1), ok(x+1, y-1), ok(x+1, y), ok(x+1, y+1),
+                ok(x, y+1), ok(x-1, y+1), ok(x-1, y), ok(x-1, y-1)]
+        ortho = sum(1 for k in range(0, 8, 2) if ring[k])
+        links = sum(1 for k in range(0, 8, 2) if ring[k] and ring[k+1] and ring[(k+2) % 8])
+        return ortho - links <= 1
+
+    def _closed(self, i):
+        label, passable = self.label, self.map.passable
+        lab = label[i]
+        label[i] = -1
+        if lab < 0:
+            return
+        self.size[lab] -= 1
+        starts = [nb for nb in self._nbrs(i) if passable[nb]]
+        if not starts:
+            del self.size[lab]
+            return
+        if len(starts) == 1 or self._ring_connected(i):
+            return
+
+        # BFS por turnos desde cada vecino; una busqueda que pisa otra se descarta
+        # (mismo pedazo). Se corta cuando queda una sola activa: ese pedazo conserva lab
+        tags = [self._new_label() for _ in starts]
+        root = {t: t for t in tags}
+        cells = {t: [s] for t, s in zip(tags, starts)}
+        queues = {t: deque([s]) for t, s in zip(tags, starts)}
+        done = []
+        for t, s in zip(tags, starts):
+            label[s] = t
+
+        def find(t):
+            while root[t] != t:
+                t = root[t]
+            return t
+
+        while len(queues) > 1:
+            for t in list(queues):
+                q = queues.get(t)
+                if q is None:
+                    continue
+                if not q:
+                    done.append(t)
+                    del queues[t]
+                    continue
+                c = q.popleft()
+                for nb in self._nbrs(c):
+                    if not passable[nb]:
+                        continue
+                    other = label[nb]
+                    if other == t:
+                        continue
+                    if other in root and find(other) != find(t) and find(other) in queues:
+                        # se toco con otra busqueda viva: es el mismo pedazo
+                        root[t] = find(other)
+                        del queues[t]
+                        break
+                    label[nb] = t
+                    cells[t].append(nb)
+                    q.append(nb)
+                if len(queues) <= 1:
+                    break
+
+        # pedazos terminados: etiqueta nueva definitiva
+        for t in done:
+            self.size[t] = sum(1 for c in cells[t] if label[c] == t)
+            self.size[lab] -= self.size[t]
+        # el resto (vivo o absorbido por el vivo) vuelve a lab
+        for t in tags:
+            if t in done:
+                continue
+            r = find(t)
+            if r in done:
+                continue
+            for c in cells[t]:
+                if label[c] == t:
+                    label[c] = lab
+        if self.size.get(lab, 0) <= 0:
+            self.size.pop(lab, None)
+
+    def label_at(self, x, y):
+        if not (0 <= x < self.w and 0 <= y < self.h):
+            return -1
+        return self.label[y*self.w + x]
+
+    def connected(self, start, goal):
+        # start puede estar sobre una celda bloqueada (sale por un vecino)
+        gl = self.label_at(*goal)
+        if gl < 0:
+            return False
+        sx, sy = start
+        sl = self.label_at(sx, sy)
+        if sl >= 0:
+            return sl == gl
+        if not (0 <= sx < self.w and 0 <= sy < self.h):
+            return False
+        return any(self.label[nb] == gl for nb in self._nbrs(sy*self.w + sx))
@@ -0,0 +1,448 @@
+import random, pygame
+from world import MapGrid, MAP_W, MAP_H, TILE, WATER, TOWER, HOSPITAL
+from actors import DwarfBase, Llama
+from planner import Planner
+from events import EventManager
+from fields import FlowField
+from spatial import SpatialHash
+from profiler import PROFILER
+from textcache import TEXT
+
+# cada cuantos ticks se mueven los enanos
+STEP_DELAY = 10
+# zona donde aparecen las oleadas (la vista del juego)
+VIEW_W_TILES = 50
+VIEW_H_TILES = 36
+
+class Projectile:
+    def __init__(self, x_px, y_px, target, T=28, g=0.45):
+        self.x = x_px
+        self.y = y_px
+        self.target = target
+        self.g = g
+        self.life = T + 10
+        tx = (target.x) * TILE + TILE*0.5
+        ty = (target.y) * TILE + TILE*0.5
+        dx = tx - self.x
+        dy = ty - self.y
+        self.vx = dx / T
+        self.vy = (dy - 0.5 * g * T * T) / T
+
+    def update(self):
+        if self.life <= 0:
+            return False
+        self.x += self.vx
+        self.y += self.vy
+        self.vy += self.g
+        self.life -= 1
+
+        if self.target and self.target.hp > 0:
+            tx = self.target.x * TILE + TILE * 0.5
+            ty = self.target.y * TILE + TILE * 0.5
+            close = (abs(self.x - tx) < 10 and abs(self.y - ty) < 10)
+            if close or self.life <= 0:
+                damage = random.randint(40, 70)
+                self.target.hp -= damage
+                if self.target.hp <= 0:
+                    self.target.hp = 0
+                    print("poncho Rojo eliminado")
+                return False
+        return True
+
+    def draw(self, surf, camx, camy):
+        px = int(self.x - camx*TILE)
+        py = int(self.y - camy*TILE)
+        pygame.draw.circle(surf, (210,210,210), (px,py), 3)
+
+class Particle:
+    def __init__(self, x_px, y_px, text="+1", color=(255, 255, 255), lifetime=30, speed=-0.8):
+        self.x = x_px
+        self.y = y_px
+        self.text = text
+        self.color = color
+        self.lifetime = lifetime
+        self.speed = speed
+        self.alpha = 255
+
+    def update(self):
+        self.lifetime -= 1
+        if self.lifetime <= 0:
+            return False
+        self.y += self.speed
+        self.alpha = max(0, int(255 * (self.lifetime / 30)))
+        return True
+
+    def draw(self, surf, camx, camy, font):
+        if self.lifetime <= 0:
+            return
+        px = int(self.x - camx*TILE)
+        py = int(self.y - camy*TILE)
+        # misma superficie cacheada para todas las particulas con ese texto
+        TEXT.blit(surf, font, self.text, self.color, (px, py), self.alpha)
+
+
+# simulacion sin pantalla: mapa, actores, planner y eventos; tick() avanza un paso
+# no abre ventana ni carga fuentes/imagenes (Game la envuelve para dibujar)
+# map_opts va directo a MapGrid (hpa, pathfinder, seed del mapa)
+class SimCore:
+    def __init__(self, map_w=MAP_W, map_h=MAP_H, seed=None, dwarves=4, llamas=5,
+                 view_w=VIEW_W_TILES, view_h=VIEW_H_TILES, **map_opts):
+        if seed is not None:
+            random.seed(seed)
+        self.map = MapGrid(map_w, map_h, **map_opts)
+        self.view_w, self.view_h = view_w, view_h
+        self.cam_x, self.cam_y = 0, 0
+
+        self.dwarves = self._spawn_dwarves(dwarves)
+
+        self.llamas = []
+        for _ in range(llamas):
+            hx, hy = self.map.home
+            lx = random.randint(hx, hx + 10)
+            ly = random.randint(hy, hy + 10)
+            if self.map.in_bounds(lx, ly) and self.map.grid[ly][lx] != WATER:
+                self.llamas.append(Llama(lx, ly, self.map))
+
+        self.resources = {"wood": 0, "stone": 0, "food": 0}
+        self.towers = []
+        self.projectiles = []
+        self.particles = []
+
+        self.planner = Planner(self)
+        self.events = EventManager(self.planner, self, enabled=True, view_w=view_w, view_h=view_h)
+        self.ponchos = []
+        self.enemy_flow = FlowField(self.map)
+        # indices espaciales (posicion en tiles, truncada como en los chequeos)
+        self.dwarf_index = SpatialHash()
+        self.poncho_index = SpatialHash()
+        self.llama_index = SpatialHash()
+
+        # la vista arranca centrada en la casa
+        hx, hy = self.map.home
+        self.cam_x = max(0, min(hx - view_w//2, self.map.w - view_w))
+        self.cam_y = max(0, min(hy - view_h//2, self.map.h - view_h))
+
+        self.step_counter = 0
+
+        self.cost_tower = {"wood": 5, "stone": 3}
+        self.cost_wall  = {"stone": 2}
+        self.cost_hosp  = {"wood": 4, "stone": 4}
+
+        self.tower_range = 7
+        self.tower_cooldown = 26
+
+        self.heal_rate = 0.6
+        self.defense_mode = False
+        # indices listos antes del primer update (se arranca en pausa)
+        self._sync_indices()
+
+    def tick(self):
+        # un paso completo: planner, eventos y mundo
+        with PROFILER.section("planner"):
+            self.planner.update()
+        with PROFILER.section("events"):
+            self.events.update()
+        with PROFILER.section("update"):
+            self.update()
+
+    def set_defense(self, on):
+        self.defense_mode = on
+        if on:
+            print("Modo defensa ACTIVADO")
+            for d in self.dwarves:
+                if d.state != "Muerto":
+                    d.cancel_task()
+                    d.defend()
+                    self.planner.note(d)
+            for tw in self.towers:
+                if "militia" not in tw:
+                    tw["militia"] = 0
+                while self.resources.get("food",0) >= 2 and tw["militia"] < 3:
+                    self.resources["food"] -= 2
+                    tw["militia"] += 1
+            print("Milicia desplegada en torres")
+        else:
+            print("Modo defensa DESACTIVADO")
+            for d in self.dwarves:
+                if d.state != "Muerto" and d.state == "Defendiendo":
+                    d.state = "Idle"
+                    d.task  = "idle"
+                    d.order_priority = 0
+                    self.planner.note(d)
+        # tareas retenidas por el modo defensa (o ahora liberadas)
+        self.planner.wake()
+
+    # spawn 
+    def _spawn_dwarves(self, n):
+        hx,hy = self.map.home
+        candidates=[]
+        for dy in range(-2,3):
+            for dx in range(-2,3):
+                x,y = hx+dx, hy+dy
+                if 0<=x<self.map.w and 0<=y<self.map.h and self.map.grid[y][x] != 1:
+                    candidates.append((x,y))
+        candidates = sorted({c for c in candidates}, key=lambda p: abs(p[0]-hx)+abs(p[1]-hy))
+        dwarves=[]; used=set()
+        for pos in candidates:
+            if len(dwarves)>=n: break
+            if pos not in used:
+                dwarves.append(DwarfBase(*pos)); used.add(pos)
+        while len(dwarves)<n:
+            dwarves.append(DwarfBase(hx, hy))
+        return dwarves
+
+    # recursos 
+    def _can_pay(self, cost: dict) -> bool:
+        return all(self.resources.get(k,0) >= v for k,v in cost.items())
+    def _pay(self, cost: dict):
+        for k,v in cost.items():
+            self.resources[k] = max(0, self.resources.get(k,0) - v)
+
+    def _enqueue_build(self, grid_pos, kind, cost):
+        x,y = grid_pos
+        if not self.map.is_buildable(x,y):
+            print(" No se puede construir aquí.")
+            return
+        if self.planner.pending("build_at", (x,y)):
+            print("Ya hay una construcción pendiente aquí.")
+            return
+        if not self._can_pay(cost):
+            print("Recursos insuficientes.")
+            return
+        self._pay(cost)
+        self.planner.push_action("build_at", payload={"pos": (x,y), "kind": kind})
+
+    def _spawn_particle(self, x_grid, y_grid, text, color):
+        px = (x_grid + 0.5) * TILE
+        py = (y_grid + 0.5) * TILE
+        self.particles.append(Particle(px, py, text, color, lifetime=35, speed=-0.7))
+
+    def command_move_dwarf(self, dwarf, gx, gy):
+        if dwarf.state == "Muerto":
+            return
+        path = self.map.astar((dwarf.x, dwarf.y), (gx, gy))
+        if path:
+            dwarf.assign_task("idle", path, priority=999, meta={"manual": True})
+            dwarf.task = "idle"
+            dwarf.manual_hold = True  # se queda quieto luego
+            self.planner.note(dwarf)
+
+    def _sync_indices(self):
+        self.dwarf_index.sync(self.dwarves, lambda d: (d.x, d.y))
+        self.poncho_index.sync(self.ponchos, lambda p: (int(p.x), int(p.y)))
+        self.llama_index.sync(self.llamas, lambda l: (int(l.x), int(l.y)))
+
+    def update(self):
+        self.step_counter += 1
+        # altas/bajas hechas fuera de update (oleadas, teclado)
+        self._sync_indices()
+
+        with PROFILER.section("sim.dwarves"):
+            if self.step_counter % STEP_DELAY == 0:
+                hospital_positions = list(self.map.positions_for(HOSPITAL))
+                for d in self.dwarves:
+                    if d.state != "Muerto" and d.task == "idle" and d.energy < 18 and hospital_positions:
+                        hx,hy = min(hospital_positions, key=lambda p: abs(p[0]-d.x)+abs(p[1]-d.y))
+                        # una sola orden por enano: repetirla no la duplica
+                        self.planner.push_action("heal", payload={"pos": (hx,hy), "dwarf": d})
+
+                for d in self.dwarves:
+                    before = (d.x,d.y, d.state, d.task, d.timer, d.meta)
+                    energy = d.energy
+                    d.move()
+                    d.tick_stats(self.map)
+                    self.dwarf_index.move(d, d.x, d.y)
+                    # tarea/estado los avisa el enano; la energia que vuelve de 0, aca
+                    if (energy <= 0) != (d.energy <= 0):
+                        self.planner.note(d)
+
+                    if getattr(self, "defense_mode", False):
+                        for p in self.poncho_index.query_manhattan(d.x, d.y, 1):
+                            if p.hp > 0 and d.state != "Muerto":
+                                damage = 150 if d.oficio == "Guardia" else 80
+                                p.hp -= damage
+                                if p.hp <= 0:
+                                    self.poncho_index.remove(p)
+                                    self._spawn_particle(int(p.x), int(p.y),"💥", (255,100,100))
+
+                    if before[2]=="Trabajando" and d.state=="Idle":
+                        task = before[3]
+                        bx, by = before[0], before[1]
+                        meta = before[5] or {}
+
+                        # recoeltar
+                        if task in ("wood", "mine", "farm"):
+                            if task == "wood":
+                                self.resources["wood"] += 1
+                                gain_texts = [("+1 Madera", (230, 200, 150))]
+                            elif task == "mine":
+                                self.resources["stone"] += 1
+                                gain_texts = [("+1 Piedra", (200, 200, 210))]
+                            elif task == "hunt":
+                                gain_texts = []
+                                llama = meta.get("target")
+                                if llama and llama.hp > 0:
+                                    llama.die()
+                                    self.resources["food"] += 5 #comida
+                                    self._spawn_particle(int(llama.x), int(llama.y), "+5 carne", (255,100,100))
+                            else:  # farm
+                                self.resources["food"] += 1
+                                gain_texts = [
+                                    ("+1 Papa", (255,230,100)),
+                                    ("+1 Coca", (100,255,100))
+                                ]
+
+                            for txt, col in gain_texts:
+                                self._spawn_particle(bx, by, txt, col)
+
+                            # eliminar tile
+                            self.map.clear_resource(bx, by)
+                    
+                        elif task == "hunt": 
+                            llama = meta.get("target")
+                            if llama and llama.hp > 0:
+                                llama.die() 
+                                self.resources["food"] += 5 
+                                self._spawn_particle(int(llama.x), int(llama.y), "+5 Papa", (255,100,100))
+
+                        elif task == "build_at":
+                            kind = meta.get("kind")
+                            px, py = meta.get("pos", (bx,by))
+                            if self.map.is_buildable(px,py):
+                                self.map.set_tile(px,py, kind)
+                                if kind == TOWER:
+                                    self.towers.append({"x":px, "y":py, "cd":0, "militia":0})
+                            else:
+                                # reembolso min (no lo veo necesario)
+                                self.resources["wood"] += 1
+                                self.resources["stone"] += 1
+
+        # enemigos: un solo campo de flujo hacia los enanos para todos
+        with PROFILER.section("sim.flow"):
+            self.enemy_flow.update(self.dwarves, self.ponchos)
+        with PROFILER.section("sim.ponchos"):
+            for p in self.ponchos:
+                p.update(self.dwarves, self.map, self.enemy_flow, self.dwarf_index)
+                if p.hp > 0:
+                    self.poncho_index.move(p, int(p.x), int(p.y))
+                else:
+                    self.poncho_index.remove(p)
+
+        # curacion
+        with PROFILER.section("sim.heal"):
+            hosp_positions = list(self.map.positions_for(HOSPITAL))
+            for d in self.dwarves:
+                if d.state != "Muerto" and d.task == "idle" and d.energy < 100:
+                    for (hx, hy) in hosp_positions:
+                        dist = abs(hx - d.x) + abs(hy - d.y)
+                        if dist <= 7:
+                            was = d.energy
+                            d.energy = min(100, d.energy + self.heal_rate)
+                            if was <= 0:
+                                self.planner.note(d)
+                            break
+
+        # torres 
+        with PROFILER.section("sim.towers"):
+            if self.towers and self.ponchos:
+                for tw in self.towers:
+                    if tw.get("cd",0) > 0:
+                        tw["cd"] -= 1
+                    else:
+                        tx, ty = tw["x"], tw["y"]
+                        target = None
+                        best_d = 999999
+                        for p in self.poncho_index.query_manhattan(tx, ty, self.tower_range):
+                            dman = abs(int(p.x) - tx) + abs(int(p.y) - ty)
+                            if dman < best_d and p.hp > 0:
+                                best_d = dman
+                                target = p
+                        if target:
+                            sx = tx*TILE + TILE*0.5
+                            sy = ty*TILE + TILE*0.2
+                            self.projectiles.append(Projectile(sx, sy, target))
+                            tw["cd"] = self.tower_cooldown
+
+            # milicia (incompleto )
+            for tw in self.towers:
+                militia = tw.get("militia", 0)
+                if militia <= 0:
+                    continue
+                tx, ty = tw["x"], tw["y"]
+                for p in self.poncho_index.query_manhattan(tx, ty, 2):
+                    if p.hp > 0:
+                        p.hp -= 60 * militia
+                        if p.hp <= 0:
+                            self.poncho_index.remove(p)
+                            self._spawn_particle(int(p.x), int(p.y), "💥", (255,180,60))
+
+            # bajas de la pasada: un solo filtrado en vez de list.remove
+            self.ponchos = [p for p in self.ponchos if p.hp > 0]
+
+        with PROFILER.section("sim.llamas"):
+            for llama in self.llamas:
+                llama.update()
+                self.llama_index.move(llama, int(llama.x), int(llama.y))
+            self.llamas = [llama for llama in self.llamas if llama.hp > 0]
+
+        with PROFILER.section("sim.projectiles"):
+            self.projectiles = [pr for pr in self.projectiles if pr.update()]
+            self.particles = [p for p in self.particles if p.update()]
+
+    # usado por planner
+    def find_nearest(self, dw, tile_type):
+        sx, sy = dw.x, dw.y
+        # recursos: bajar por el campo de distancias
+        if tile_type in self.map.fields:
+            return self.map.nearest_resource((sx, sy), tile_type)
+        positions = list(self.map.positions_for(tile_type))
+        if not positions:
+            return None, []
+        if (sx, sy) in positions:
+            return (sx, sy), []
+        # varias metas: una BFS que corta en la primera
+        if len(positions) > 1:
+            return self.map.nearest_of((sx, sy), positions)
+        positions.sort(key=lambda p: abs(p[0]-sx)+abs(p[1]-sy))
+        TRIES = min(20, len(positions))
+        for i in range(TRIES):
+            goal = positions[i]
+            if goal == (sx, sy):
+                return goal, []
+            path = self.map.astar((sx,sy), goal)
+            if path:
+                return goal, path
+        return None, []
+
+
+# corrida sin pantalla para experimentos: python sim.py [--ticks N] [--seed N]
+if __name__ == "__main__":
+    import argparse, contextlib, io, time
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--ticks", type=int, default=5000)
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--dwarves", type=int, default=4)
+    ap.add_argument("--verbose", action="store_true")
+    ap.add_argument("--profile", action="store_true", help="tiempos por subsistema al final")
+    args = ap.parse_args()
+    PROFILER.set_enabled(args.profile)
+    PROFILER.window = args.ticks
+    quiet = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(io.StringIO())
+    with quiet:
+        sim = SimCore(seed=args.seed, dwarves=args.dwarves)
+        for t in ("wood", "mine", "farm", "hunt"):
+            sim.planner.push_action(t, 2)
+        t0 = time.perf_counter()
+        for _ in range(args.ticks):
+            sim.tick()
+            PROFILER.end_frame()
+        dt = time.perf_counter() - t0
+    print(f"{args.ticks} ticks en {dt:.2f}s ({args.ticks/max(dt, 1e-9):.0f} ticks/s)"
+          f"  recursos={sim.resources}  oleada={sim.events.wave_number}"
+          f"  enanos vivos={sum(d.state != 'Muerto' for d in sim.dwarves)}")
+    if args.profile:
+        rows, counts = PROFILER.summary()
+        for name, avg, mx in rows:
+            print(f"  {name:16s} prom={avg:8.3f} ms  max={mx:8.3f} ms")
+        for name, v in sorted(counts.items()):
+            print(f"  {name:16s} {v:8.3f} por tick")
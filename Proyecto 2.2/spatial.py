@@ -0,0 +1,124 @@
+# indice espacial de grilla uniforme: los actores van a baldes de CELL x CELL tiles
+# asi las consultas de cercania miran solo los baldes vecinos y no toda la lista
+CELL = 8
+
+
+class SpatialHash:
+    def __init__(self, cell=CELL):
+        self.cell = cell
+        # (bx, by) -> {actor: None} (dict para mantener orden de insercion)
+        self.buckets = {}
+        # actor -> (x, y) con que se guardo
+        self.pos = {}
+
+    def __len__(self):
+        return len(self.pos)
+
+    def __contains__(self, obj):
+        return obj in self.pos
+
+    def _key(self, x, y):
+        c = self.cell
+        return (int(x) // c, int(y) // c)
+
+    def move(self, obj, x, y):
+        # agrega o mueve; solo cambia de balde si cruzo el borde
+        old = self.pos.get(obj)
+        self.pos[obj] = (x, y)
+        k = self._key(x, y)
+        if old is not None:
+            ok = self._key(*old)
+            if ok == k:
+                return
+            self._drop(obj, ok)
+        self.buckets.setdefault(k, {})[obj] = None
+
+    insert = move
+
+    def _drop(self, obj, k):
+        b = self.buckets[k]
+        del b[obj]
+        if not b:
+            del self.buckets[k]
+
+    def remove(self, obj):
+        old = self.pos.pop(obj, None)
+        if old is not None:
+            self._drop(obj, self._key(*old))
+
+    def clear(self):
+        self.buckets.clear()
+        self.pos.clear()
+
+    def sync(self, objs, pos):
+        # deja el indice igual a objs; pos(obj) -> (x, y)
+        for o in objs:
+            self.move(o, *pos(o))
+        if len(self.pos) != len(objs):
+            keep = set(objs)
+            for o in [o for o in self.pos if o not in keep]:
+                self.remove(o)
+
+    def _near(self, x, y, r):
+        c = self.cell
+        bx0, by0 = int((x - r) // c), int((y - r) // c)
+        bx1, by1 = int((x + r) // c), int((y + r) // c)
+        buckets = self.buckets
+        for by in range(by0, by1 + 1):
+            for bx in range(bx0, bx1 + 1):
+                b = buckets.get((bx, by))
+                if b:
+                    yield from b
+
+    def query_manhattan(self, x, y, r):
+        # actores con |dx| + |dy| <= r
+        pos = self.pos
+        out = []
+        for o in self._near(x, y, r):
+            ox, oy = pos[o]
+            if abs(ox - x) + abs(oy - y) <= r:
+                out.append(o)
+        return out
+
+    def query_radius(self, x, y, r):
+        # actores a distancia euclidea <= r
+        pos = self.pos
+        r2 = r*r
+        out = []
+        for o in self._near(x, y, r):
+            ox, oy = pos[o]
+            if (ox - x)**2 + (oy - y)**2 <= r2:
+                out.append(o)
+        return out
+
+    def nearest(self, x, y, accept=None):
+        # el mas cercano en Manhattan (que pase accept); recorre anillos de baldes
+        # y corta cuando el anillo ya no puede mejorar lo encontrado
+        if not self.pos:
+            return None
+        c, pos, buckets = self.cell, self.pos, self.buckets
+        cx, cy = self._key(x, y)
+        kmax = max(max(abs(bx - cx), abs(by - cy)) for bx, by in buckets)
+        best, best_d = None, None
+        for k in range(kmax + 1):
+            if best is not None and best_d <= (k - 1) * c:
+                break
+            if k == 0:
+                ring = ((cx, cy),)
+            else:
+                ring = [(cx + i, cy - k) for i in range(-k, k + 1)]
+                ring += [(cx + i, cy + k) for i in range(-k, k + 1)]
+                ring += [(cx - k, cy + j) for j in range(-k + 1, k)]
+                ring += [(cx + k, cy + j) for j in range(-k + 1, k)]
+            for key in ring:
+                b = buckets.get(key)
+                if not b:
+                    continue
+                for o in b:
+                    if accept is not None and not accept(o):
+                        continue
+                    ox, oy = pos[o]
+                    d = abs(ox - x) + abs(oy - y)
+                    if best is None or d < best_d:
+                        best, best_d = o, d
+        return best
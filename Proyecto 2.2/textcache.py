@@ -0,0 +1,81 @@
+# textos renderizados una sola vez: (fuente, texto, color) -> superficie con LRU
+# las fuentes tambien se crean una vez (SysFont es lento)
+# para numeros que cambian seguido: blit_glyphs arma el texto con letras ya cacheadas
+from collections import OrderedDict
+import pygame
+
+TEXT_CACHE_SIZE = 512
+
+_fonts = {}
+
+
+def get_font(name, size, bold=False):
+    key = (name, size, bold)
+    font = _fonts.get(key)
+    if font is None:
+        font = _fonts[key] = pygame.font.SysFont(name, size, bold=bold)
+    return font
+
+
+class TextCache:
+    def __init__(self, size=TEXT_CACHE_SIZE):
+        self.size = size
+        self.items = OrderedDict()
+        # letra suelta -> (superficie, avance)
+        self.glyphs = {}
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.items)
+
+    def render(self, font, text, color):
+        key = (font, text, color)
+        surf = self.items.get(key)
+        if surf is not None:
+            self.items.move_to_end(key)
+            self.hits += 1
+            return surf
+        self.misses += 1
+        surf = font.render(text, True, color)
+        if pygame.display.get_surface() is not None:
+            surf = surf.convert_alpha()
+        self.items[key] = surf
+        if len(self.items) > self.size:
+            self.items.popitem(last=False)
+        return surf
+
+    def blit(self, dest, font, text, color, pos, alpha=None):
+        # alpha sobre la superficie compartida solo durante el blit
+        surf = self.render(font, text, color)
+        if alpha is None or alpha >= 255:
+            return dest.blit(surf, pos)
+        surf.set_alpha(alpha)
+        rect = dest.blit(surf, pos)
+        surf.set_alpha(255)
+        return rect
+
+    def _glyph(self, font, ch, color):
+        key = (font, ch, color)
+        g = self.glyphs.get(key)
+        if g is None:
+            surf = font.render(ch, True, color)
+            if pygame.display.get_surface() is not None:
+                surf = surf.convert_alpha()
+            g = self.glyphs[key] = (surf, font.size(ch)[0])
+        return g
+
+    def blit_glyphs(self, dest, font, text, color, pos):
+        # letra por letra desde el cache (sin kerning); para contadores que cambian
+        x, y = pos
+        seq = []
+        for ch in text:
+            surf, adv = self._glyph(font, ch, color)
+            seq.append((surf, (x, y)))
+            x += adv
+        dest.blits(seq, doreturn=False)
+        return x - pos[0]
+
+
+# cache unico del juego
+TEXT = TextCache()
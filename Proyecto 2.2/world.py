@@ -1,119 +1,59 @@
-import random, heapq, pygame, math
-import os
+import random, pygame, math
+try:
+    import numpy as np
+except ImportError:  # sin numpy: generador en Python puro
+    np = None
+from fields import DistanceField, reach
+from pathfinding import PATHFINDERS, PathCache
+from profiler import PROFILER
+from regions import RegionLabels
+from hpa import HierarchicalPathfinder
 
 # tamaño del tile
 TILE = 16
 # dimensiones del mapa
 MAP_W, MAP_H = 200, 150
+# caminos guardados en MapGrid.path_cache
+PATH_CACHE_SIZE = 2048
+# motor de busqueda por defecto (ver pathfinding.PATHFINDERS)
+PATHFINDER = "astar"
+# HPA* se activa solo en mapas grandes y para viajes largos
+HPA_MIN_AREA = 500*500
+HPA_MIN_DIST = 64
 
 # tipos de celda
 EMPTY, WALL, FOREST, MINE, WATER, GRANARY, HOME, FARM = range(8)
 TOWER, WALL_DEF, DOOR, HOSPITAL = 8, 9, 10, 11
 
+# no se puede caminar
+BLOCKING = (WALL, WALL_DEF, TOWER, WATER)
+# recursos con campo de distancias
+RESOURCE_KINDS = (FOREST, MINE, FARM)
 
+# terreno pre-dibujado en bloques de CHUNK x CHUNK tiles
+CHUNK = 16
+# animacion del terreno en ANIM_PHASES cuadros pre-armados; por tipo:
+# (rad por tick, peso de x, peso de y) de la fase sin((x*wx + y*wy + tick) * rad)
+ANIM_PHASES = 16
+ANIM_WAVES = {WATER: (0.08, 0.4, 0.3), FOREST: (0.05, 1.0, 1.0), MINE: (0.04, 1.0, 1.0)}
+# cuadros (agua, puntitos de recurso, vaiven de arbol/mina); se arma al primer draw
+ANIM = None
+
+# reglas del generador (las usan las dos versiones)
+# recurso: (tipo, fraccion del area, cantidad min, cantidad max)
+RESOURCE_RULES = ((FOREST, 0.10, 4, 8), (MINE, 0.06, 3, 6), (FARM, 0.05, 5, 10))
+LAKES, LAKE_RMIN, LAKE_RMAX, LAKE_ROUGH = 12, 4, 9, 0.25
+RIVER_PROB, RIVER_WIDTH = 0.55, 1
+
+
+# sprites (los pone assets.load_assets; None = se dibuja sin sprite)
 TREE_IMG = None
 MINE_IMG = None
 TOWER_IMG = None
 HOSPITAL_IMG = None
 WALL_IMG = None
-PONCHO_IMGS = [] 
 BOSS_IMGS = []
 
-
-def load_tree_sprite():
-    global TREE_IMG
-    base_path = os.path.dirname(__file__)
-    sprites_path = os.path.join(base_path, "sprites")
-    img_path = os.path.join(sprites_path, "tree.png")
-    if os.path.exists(img_path):
-        TREE_IMG = pygame.image.load(img_path).convert_alpha()
-        factor = 1.3
-        TREE_IMG = pygame.transform.scale(TREE_IMG, (int(TILE*factor), int(TILE*factor)))
-    else:
-        TREE_IMG = None
-
-def load_mine_sprite():
-    global MINE_IMG
-    base_path = os.path.dirname(__file__)
-    sprites_path = os.path.join(base_path, "sprites")
-    img_path = os.path.join(sprites_path, "mineral.png")
-    if os.path.exists(img_path):
-        MINE_IMG = pygame.image.load(img_path).convert_alpha()
-        factor = 1.6
-        MINE_IMG = pygame.transform.scale(MINE_IMG, (int(TILE*factor), int(TILE*factor)))
-    else:
-        MINE_IMG = None
-
-def load_tower_sprite():
-    global TOWER_IMG
-    base_path = os.path.dirname(__file__)
-    sprites_path = os.path.join(base_path, "sprites")
-    img_path = os.path.join(sprites_path, "cholet.png")
-    if os.path.exists(img_path):
-        TOWER_IMG = pygame.image.load(img_path).convert_alpha()
-        TOWER_IMG = pygame.transform.scale(TOWER_IMG, (int(TILE*4), int(TILE*4)))
-    else:
-        TOWER_IMG = None
-
-def load_hospital_sprite():
-    global HOSPITAL_IMG
-    base_path = os.path.dirname(__file__)
-    sprites_path = os.path.join(base_path, "sprites")
-    img_path = os.path.join(sprites_path, "cholet2.png")
-    if os.path.exists(img_path):
-        HOSPITAL_IMG = pygame.image.load(img_path).convert_alpha()
-        HOSPITAL_IMG = pygame.transform.scale(HOSPITAL_IMG, (int(TILE*4), int(TILE*4)))
-    else:
-        HOSPITAL_IMG = None
-
-def load_boss_sprites():
-    #cargar sprites boss, circulo si no funciona
-    global BOSS_IMGS
-    BOSS_IMGS = []
-
-    base_path = os.path.dirname(__file__)
-    sprites_path = os.path.join(base_path, "sprites")
-
-    file_names = ["boss1.png", "boss2.png"]
-
-    factor = 2.2  # jefe más grande
-
-    print("=== [load_boss_sprites] ===")
-    print("Buscando sprites del jefe en:", sprites_path)
-
-    for name in file_names:
-        img_path = os.path.join(sprites_path, name)
-        print("  Intentando cargar:", img_path)
-
-        if not os.path.exists(img_path):
-            print(" NO EXISTE:", img_path)
-            continue
-
-        try:
-            img = pygame.image.load(img_path).convert_alpha()
-            w = int(TILE * factor)
-            h = int(TILE * factor)
-            img = pygame.transform.scale(img, (w, h))
-            BOSS_IMGS.append(img)
-            print(f"Cargado {name} ({w}x{h})")
-        except Exception as e:
-            print(" Error cargando", name, "->", e)
-
-    print("Total frames jefe cargados:", len(BOSS_IMGS))
-    print("============================")
-def load_wall_sprite():
-    global WALL_IMG
-    base_path = os.path.dirname(__file__)
-    sprites_path = os.path.join(base_path, "sprites")
-    img_path = os.path.join(sprites_path, "wall.png")
-    if os.path.exists(img_path):
-        WALL_IMG = pygame.image.load(img_path).convert_alpha()
-        factor = 1.6 
-        WALL_IMG = pygame.transform.scale(WALL_IMG, (int(TILE*factor), int(TILE*factor)))
-    else:
-        WALL_IMG = None
-        print("Warning: wall.png sprite not found.")
-
 # paleta
 COLORS = {
     EMPTY:   (130, 200, 140),
@@ -139,21 +79,39 @@ def shade(c, k):
 def manhattan(a,b): return abs(a[0]-b[0]) + abs(a[1]-b[1])
 
 class MapGrid:
-    def __init__(self, w=MAP_W, h=MAP_H):
+    def __init__(self, w=MAP_W, h=MAP_H, hpa=None, pathfinder=PATHFINDER, seed=None):
         self.w, self.h = w, h
-        self.grid = [[EMPTY for _ in range(w)] for _ in range(h)]
         self.resource_amount = {}
-        self.idx = {FOREST:set(), MINE:set(), FARM:set(), HOSPITAL:set()}
-        self._generate()
+        self.idx = {FOREST:set(), MINE:set(), FARM:set(), HOSPITAL:set(), TOWER:set()}
+        # seed=None: sale del random global (random.seed sigue reproduciendo el mapa)
+        self._generate(seed)
+        self.fields = {k: DistanceField(self, self.idx[k]) for k in RESOURCE_KINDS}
+        self.regions = RegionLabels(self)
+        self.pathfinder = PATHFINDERS[pathfinder](self)
+        # sube con cada cambio de celda / recurso
+        self.revision = 0
+        # sube solo cuando cambia la pasabilidad de alguna celda
+        self.pass_revision = 0
+        # llamadas a astar (con cache y atajos incluidos)
+        self.astar_calls = 0
+        self.path_cache = PathCache(w, h, PATH_CACHE_SIZE)
+        # (cx, cy) -> (superficie, celdas que se dibujan cada frame); se arma al dibujar
+        self.chunks = {}
+        # fn(x, y) llamadas en cada cambio de celda (minimapa, etc.)
+        self.tile_listeners = []
+        if hpa is None:
+            hpa = w*h >= HPA_MIN_AREA
+        self.hpa = HierarchicalPathfinder(self) if hpa else None
 
     def _place(self, kind, count, lo=0, hi=0):
+        rng = self._rng
         placed = 0
         while placed < count:
-            x,y = random.randint(1,self.w-2), random.randint(1,self.h-2)
+            x,y = rng.randint(1,self.w-2), rng.randint(1,self.h-2)
             if self.grid[y][x]==EMPTY:
                 self.grid[y][x] = kind
                 if kind in (FOREST, MINE, FARM):
-                    self.resource_amount[(x,y)] = random.randint(lo,hi)
+                    self.resource_amount[(x,y)] = rng.randint(lo,hi)
                     self.idx[kind].add((x,y))
                 placed += 1
 
@@ -164,7 +122,7 @@ class MapGrid:
                 if x <= 0 or x >= self.w-1: continue
                 nx = (x - cx) / max(1, rx)
                 ny = (y - cy) / max(1, ry)
-                inside = (nx*nx + ny*ny) <= 1.0 + (random.random()-0.5)*rough
+                inside = (nx*nx + ny*ny) <= 1.0 + (self._rng.random()-0.5)*rough
                 if inside and self.grid[y][x] != WALL:
                     self.grid[y][x] = WATER
 
@@ -172,10 +130,11 @@ class MapGrid:
         (x0, y0), (x1, y1) = a, b
         steps = max(abs(x1-x0), abs(y1-y0))
         if steps == 0: return
+        rng = self._rng
         for i in range(1, steps+1):
             t = i/steps
-            x = int(round(x0 + (x1-x0)*t + random.randint(-1,1)))
-            y = int(round(y0 + (y1-y0)*t + random.randint(-1,1)))
+            x = int(round(x0 + (x1-x0)*t + rng.randint(-1,1)))
+            y = int(round(y0 + (y1-y0)*t + rng.randint(-1,1)))
             for oy in range(-width, width+1):
                 for ox in range(-width, width+1):
                     xx, yy = x+ox, y+oy
@@ -184,35 +143,123 @@ class MapGrid:
                             self.grid[yy][xx] = WATER
 
     def _place_water_blobs(self, lakes=12, rmin=4, rmax=9, connect_prob=0.55):
+        rng = self._rng
         lake_centers = []
         for _ in range(lakes):
-            cx = random.randint(3, self.w-4)
-            cy = random.randint(3, self.h-4)
-            rx = random.randint(rmin, rmax)
-            ry = random.randint(max(3, rmin-1), rmax)
-            self._stamp_water_ellipse(cx, cy, rx, ry, rough=0.25)
+            cx = rng.randint(3, self.w-4)
+            cy = rng.randint(3, self.h-4)
+            rx = rng.randint(rmin, rmax)
+            ry = rng.randint(max(3, rmin-1), rmax)
+            self._stamp_water_ellipse(cx, cy, rx, ry, rough=LAKE_ROUGH)
             lake_centers.append((cx, cy))
-        random.shuffle(lake_centers)
+        rng.shuffle(lake_centers)
         for i in range(len(lake_centers)-1):
-            if random.random() < connect_prob:
-                self._carve_river(lake_centers[i], lake_centers[i+1], width=1)
-
-    def _generate(self):
+            if rng.random() < connect_prob:
+                self._carve_river(lake_centers[i], lake_centers[i+1], width=RIVER_WIDTH)
+
+    def _generate(self, seed=None):
+        if np is None:
+            self._generate_py(seed)
+            self.passable = bytearray(
+                0 if k in BLOCKING else 1 for row in self.grid for k in row
+            )
+        else:
+            g = self._generate_np(seed)
+            self.passable = bytearray((~np.isin(g, BLOCKING)).astype(np.uint8).tobytes())
+
+    def _generate_py(self, seed=None):
+        # celda por celda; con seed usa su propio Random
+        self._rng = random if seed is None else random.Random(seed)
+        self.grid = [[EMPTY for _ in range(self.w)] for _ in range(self.h)]
         for x in range(self.w):
             self.grid[0][x] = self.grid[self.h-1][x] = WALL
         for y in range(self.h):
             self.grid[y][0] = self.grid[y][self.w-1] = WALL
 
         area = self.w * self.h
-        self._place(FOREST, int(area*0.10), 4, 8)
-        self._place(MINE,   int(area*0.06), 3, 6)
-        self._place(FARM,   int(area*0.05), 5,10)
-        self._place_water_blobs(lakes=12, rmin=4, rmax=9, connect_prob=0.55)
+        for kind, frac, lo, hi in RESOURCE_RULES:
+            self._place(kind, int(area*frac), lo, hi)
+        self._place_water_blobs(lakes=LAKES, rmin=LAKE_RMIN, rmax=LAKE_RMAX, connect_prob=RIVER_PROB)
 
         self.home    = (2,2)
         self.granary = (self.w-3, self.h-3)
         self.grid[self.home[1]][self.home[0]]       = HOME
         self.grid[self.granary[1]][self.granary[0]] = GRANARY
+        # agua/casa/granero tapan recursos: sacarlos de los indices
+        for kind in RESOURCE_KINDS:
+            for (x,y) in [p for p in self.idx[kind] if self.grid[p[1]][p[0]] != kind]:
+                self.idx[kind].discard((x,y))
+                self.resource_amount.pop((x,y), None)
+
+    def _generate_np(self, seed=None):
+        # mismas reglas que _generate_py, pero con operaciones sobre arrays;
+        # devuelve el grid como array (h, w)
+        if seed is None:
+            seed = random.getrandbits(32)
+        rng = np.random.default_rng(seed)
+        w, h = self.w, self.h
+        g = np.full((h, w), EMPTY, dtype=np.uint8)
+        g[0, :] = g[h-1, :] = WALL
+        g[:, 0] = g[:, w-1] = WALL
+        amount = np.zeros((h, w), dtype=np.int32)
+
+        # recursos: muestreo sin reemplazo entre las celdas interiores libres
+        area = w * h
+        inner = g[1:h-1, 1:w-1]
+        for kind, frac, lo, hi in RESOURCE_RULES:
+            free = np.flatnonzero(inner == EMPTY)
+            pick = rng.choice(free, min(int(area*frac), free.size), replace=False)
+            ys, xs = pick // (w-2) + 1, pick % (w-2) + 1
+            g[ys, xs] = kind
+            amount[ys, xs] = rng.integers(lo, hi + 1, pick.size)
+
+        # lagos (elipses con borde rugoso) y rios entre centros mezclados
+        centers = []
+        for _ in range(LAKES):
+            cx, cy = int(rng.integers(3, w-3)), int(rng.integers(3, h-3))
+            rx = int(rng.integers(LAKE_RMIN, LAKE_RMAX + 1))
+            ry = int(rng.integers(max(3, LAKE_RMIN-1), LAKE_RMAX + 1))
+            y0, y1 = max(1, cy-ry), min(h-2, cy+ry)
+            x0, x1 = max(1, cx-rx), min(w-2, cx+rx)
+            if y0 > y1 or x0 > x1:
+                continue
+            ny = (np.arange(y0, y1+1) - cy)[:, None] / max(1, ry)
+            nx = (np.arange(x0, x1+1) - cx)[None, :] / max(1, rx)
+            jitter = (rng.random((y1-y0+1, x1-x0+1)) - 0.5) * LAKE_ROUGH
+            box = g[y0:y1+1, x0:x1+1]
+            box[(nx*nx + ny*ny <= 1.0 + jitter) & (box != WALL)] = WATER
+            centers.append((cx, cy))
+        centers = [centers[i] for i in rng.permutation(len(centers))]
+        off = np.arange(-RIVER_WIDTH, RIVER_WIDTH + 1)
+        for (ax, ay), (bx, by) in zip(centers, centers[1:]):
+            if rng.random() >= RIVER_PROB:
+                continue
+            steps = max(abs(bx-ax), abs(by-ay))
+            if steps == 0:
+                continue
+            t = np.arange(1, steps + 1) / steps
+            px = np.rint(ax + (bx-ax)*t + rng.integers(-1, 2, steps)).astype(np.int64)
+            py = np.rint(ay + (by-ay)*t + rng.integers(-1, 2, steps)).astype(np.int64)
+            xx = (px[:, None, None] + off[None, None, :]).repeat(off.size, 1)
+            yy = (py[:, None, None] + off[None, :, None]).repeat(off.size, 2)
+            ok = (xx >= 1) & (xx < w-1) & (yy >= 1) & (yy < h-1)
+            xx, yy = xx[ok], yy[ok]
+            keep = g[yy, xx] != WALL
+            g[yy[keep], xx[keep]] = WATER
+
+        self.home    = (2,2)
+        self.granary = (w-3, h-3)
+        g[self.home[1], self.home[0]] = HOME
+        g[self.granary[1], self.granary[0]] = GRANARY
+
+        # indices en bloque; lo tapado por agua/casa/granero ya no es recurso
+        self.grid = g.tolist()
+        for kind in RESOURCE_KINDS:
+            ys, xs = np.nonzero(g == kind)
+            cells = list(zip(xs.tolist(), ys.tolist()))
+            self.idx[kind] = set(cells)
+            self.resource_amount.update(zip(cells, amount[ys, xs].tolist()))
+        return g
 
     def in_bounds(self, x, y): return 0 <= x < self.w and 0 <= y < self.h
 
@@ -228,53 +275,134 @@ class MapGrid:
 
     def set_tile(self, x, y, kind):
         if self.in_bounds(x,y):
+            old = self.grid[y][x]
             self.grid[y][x] = kind
-            if kind == HOSPITAL:
-                self.idx[HOSPITAL].add((x,y))
+            if old in self.idx and old != kind:
+                self.idx[old].discard((x,y))
+            if kind in self.idx:
+                self.idx[kind].add((x,y))
+            self._tile_changed(x, y, old)
+
+    def _tile_changed(self, x, y, old):
+        # todo cambio de celda pasa por aqui (paso + campos)
+        i = y*self.w + x
+        kind = self.grid[y][x]
+        was = self.passable[i]
+        self.passable[i] = 0 if kind in BLOCKING else 1
+        self.revision += 1
+        if was != self.passable[i]:
+            self.pass_revision += 1
+            self.path_cache.tile_changed(x, y, self.revision, opened=not was)
+            if self.hpa is not None:
+                self.hpa.tile_changed(x, y)
+        self.regions.refresh(i, was)
+        for k, field in self.fields.items():
+            field.refresh(i, was, kind == k)
+        # el bloque de terreno se vuelve a dibujar cuando se vea
+        self.chunks.pop((x // CHUNK, y // CHUNK), None)
+        for fn in self.tile_listeners:
+            fn(x, y)
 
     def neighbors(self,x,y):
         for dx,dy in ((1,0),(-1,0),(0,1),(0,-1)):
             nx,ny = x+dx, y+dy
             if 0<=nx<self.w and 0<=ny<self.h:
-                if self.grid[ny][nx] in (WALL, WALL_DEF, TOWER, WATER):
+                if self.grid[ny][nx] in BLOCKING:
                     continue
                 yield nx,ny
 
-    def astar(self, start, goal):
+    def set_pathfinder(self, name):
+        # cambia el motor; los caminos guardados pueden diferir (mismo largo)
+        self.pathfinder = PATHFINDERS[name](self)
+        self.path_cache.clear()
+
+    def reachable(self, start, goal):
+        return self.regions.connected(start, goal)
+
+    def astar(self, start, goal, max_expansions=None):
+        self.astar_calls += 1
+        PROFILER.count("astar")
         if not goal or start == goal:
             return []
-        sx,sy = start; gx,gy = goal
-        if not self.in_bounds(gx,gy):
+        # otra componente (lago, torre, isla): ni buscar
+        if not self.regions.connected(start, goal):
             return []
-        openh=[]; heapq.heappush(openh,(0,start))
-        came={start:None}; g={start:0}
-        while openh:
-            _,cur = heapq.heappop(openh)
-            if cur==goal: break
-            for nx,ny in self.neighbors(*cur):
-                ng=g[cur]+1
-                if (nx,ny) not in g or ng<g[(nx,ny)]:
-                    g[(nx,ny)]=ng
-                    f=ng+abs(nx-gx)+abs(ny-gy)
-                    heapq.heappush(openh,(f,(nx,ny)))
-                    came[(nx,ny)]=cur
-        if goal not in came:
-            return []
-        path=[]; cur=goal
-        while cur and cur!=start:
-            path.append(cur); cur=came[cur]
-        path.reverse()
+        start, goal = tuple(start), tuple(goal)
+        # viaje largo en mapa grande: camino jerarquico que se refina al andar
+        if self.hpa is not None and manhattan(start, goal) >= HPA_MIN_DIST:
+            path = self.hpa.find_path(start, goal)
+            if path:
+                return path
+        path = self.path_cache.get(start, goal)
+        if path is not None:
+            return path
+        path = self.pathfinder.search(start, goal, max_expansions)
+        self.path_cache.put(start, goal, path, self.revision)
         return path
 
     def consume_resource(self, x, y):
         if (x,y) in self.resource_amount:
             self.resource_amount[(x,y)] -= 1
+            self.revision += 1
             if self.resource_amount[(x,y)] <= 0:
-                del self.resource_amount[(x,y)]
-                kind = self.grid[y][x]
-                if kind in self.idx and (x,y) in self.idx[kind]:
-                    self.idx[kind].remove((x,y))
-                self.grid[y][x] = EMPTY
+                self.clear_resource(x, y)
+
+    def clear_resource(self, x, y):
+        # recurso agotado / cosechado -> EMPTY
+        self.resource_amount.pop((x,y), None)
+        kind = self.grid[y][x]
+        if kind in RESOURCE_KINDS:
+            self.idx[kind].discard((x,y))
+            self.grid[y][x] = EMPTY
+            self._tile_changed(x, y, kind)
+
+    def nearest_resource(self, start, kind):
+        # recurso alcanzable mas cercano, sin A*
+        return self.fields[kind].path_from(start)
+
+    def nearest_of(self, start, targets):
+        # BFS desde start que corta en la primera meta alcanzada: (meta, camino)
+        w, h = self.w, self.h
+        sx, sy = start
+        if not (0 <= sx < w and 0 <= sy < h):
+            return None, []
+        goals = {y*w + x for (x, y) in targets
+                 if 0 <= x < w and 0 <= y < h and self.passable[y*w + x]}
+        if not goals:
+            return None, []
+        s = sy*w + sx
+        found, parent, _ = reach(self, (s,), goals, first=True)
+        if not found:
+            return None, []
+        t = next(iter(found))
+        path = []
+        c = t
+        while c != s:
+            path.append((c % w, c // w))
+            c = parent[c]
+        path.reverse()
+        return (t % w, t // w), path
+
+    def rank_to_targets(self, starts, targets):
+        # BFS inversa desde todas las metas a la vez: [(dist, k, meta)] ordenado,
+        # con k el indice en starts; los que no llegan a ninguna meta no aparecen
+        w, h = self.w, self.h
+        sources = [y*w + x for (x, y) in targets
+                   if 0 <= x < w and 0 <= y < h and self.passable[y*w + x]]
+        cells = {}
+        for k, (x, y) in enumerate(starts):
+            if 0 <= x < w and 0 <= y < h:
+                cells.setdefault(y*w + x, []).append(k)
+        if not sources or not cells:
+            return []
+        found, _, origin = reach(self, sources, cells)
+        ranking = []
+        for i, d in found.items():
+            t = origin[i]
+            for k in cells[i]:
+                ranking.append((d, k, (t % w, t // w)))
+        ranking.sort()
+        return ranking
 
     def positions_for(self, tile_type):
         if tile_type in self.idx:
@@ -297,59 +425,136 @@ class MapGrid:
         pygame.draw.rect(surf, shade(base, 0.75), (x, y+TILE-4, TILE, 4), border_radius=2)
         pygame.draw.rect(surf, shade(base, 1.12), (x, y, TILE, 3), border_radius=2)
 
-    def _draw_detail(self, surf, x, y, kind, tick):
-        if (x//TILE, y//TILE) in self.resource_amount:
-            v = self.resource_amount[(x//TILE, y//TILE)]
-            dots = min(3, v)
-            for i in range(dots):
-                ox = 2 + (i*4 + (tick//6)%3) % (TILE-6)
-                oy = TILE-6 - (i*2)
-                pygame.draw.rect(surf, (255, 180, 80), (x+ox, y+oy, 3, 3))
-
-        if kind == MINE and MINE_IMG:
-            offset = int(1.0 * math.sin((x + y + tick) * 0.04))
-            rect = MINE_IMG.get_rect(center=(x + TILE // 2, y + TILE // 2 + offset))
-            surf.blit(MINE_IMG, rect)
-        elif kind == FOREST and TREE_IMG:
-            offset = int(1.5 * math.sin((x + y + tick) * 0.05))
-            surf.blit(TREE_IMG, (x, y + offset))
-        elif kind == WATER:
-            k = 1.0 + 0.08*math.sin((x*0.4+y*0.3+tick)*0.08)
-            pygame.draw.rect(surf, shade(COLORS[WATER], k), (x+2, y+2, TILE-4, TILE-6), border_radius=3)
-        elif kind == WALL_DEF:
-                    if WALL_IMG:
-                        rect = WALL_IMG.get_rect(center=(x + TILE // 2, y + TILE // 2))
-                        surf.blit(WALL_IMG, rect)
-                    else:
-                        pygame.draw.rect(surf, shade(COLORS[WALL_DEF], 0.9), (x+2, y+6, TILE-4, TILE-6), border_radius=2)
+    def _is_live(self, x, y, kind):
+        # celdas animadas o con sprite que se sale del tile: van encima del chunk
+        if kind in (FOREST, MINE, WATER) or (x, y) in self.resource_amount:
+            return True
+        return kind == WALL_DEF and WALL_IMG is not None
+
+    def _draw_static_detail(self, surf, x, y, kind):
+        if kind == WALL_DEF:
+            pygame.draw.rect(surf, shade(COLORS[WALL_DEF], 0.9), (x+2, y+6, TILE-4, TILE-6), border_radius=2)
         elif kind == DOOR:
             pygame.draw.rect(surf, shade(COLORS[DOOR], 1.0), (x+2, y+6, TILE-4, TILE-6), border_radius=2)
             pygame.draw.rect(surf, shade(COLORS[DOOR], 1.2), (x+6, y+4, TILE-12, TILE-4), border_radius=2)
 
+    def _build_anim(self):
+        # cada cuadro una vez: despues dibujar es un blit por celda
+        global ANIM
+        conv = pygame.display.get_surface() is not None
+        wave = [math.sin(2*math.pi*b/ANIM_PHASES) for b in range(ANIM_PHASES)]
+        water = []
+        for v in wave:
+            f = pygame.Surface((TILE, TILE))
+            self._draw_beveled(f, 0, 0, COLORS[WATER])
+            pygame.draw.rect(f, shade(COLORS[WATER], 1.0 + 0.08*v), (2, 2, TILE-4, TILE-6), border_radius=3)
+            water.append(f.convert() if conv else f)
+        # puntitos: (cantidad, corrimiento) -> tile transparente
+        dots = {}
+        for n in range(1, 4):
+            for shift in range(3):
+                f = pygame.Surface((TILE, TILE), pygame.SRCALPHA)
+                for i in range(n):
+                    ox = 2 + (i*4 + shift) % (TILE-6)
+                    oy = TILE-6 - (i*2)
+                    pygame.draw.rect(f, (255, 180, 80), (ox, oy, 3, 3))
+                dots[(n, shift)] = f.convert_alpha() if conv else f
+        ANIM = {
+            WATER: water,
+            FOREST: [int(1.5 * v) for v in wave],
+            MINE: [int(1.0 * v) for v in wave],
+            "dots": dots,
+        }
+        return ANIM
+
+    def _render_chunk(self, cx, cy):
+        # terreno fijo del bloque en una superficie + lista de celdas vivas
+        x0, y0 = cx*CHUNK, cy*CHUNK
+        x1, y1 = min(self.w, x0 + CHUNK), min(self.h, y0 + CHUNK)
+        chunk = pygame.Surface(((x1-x0)*TILE, (y1-y0)*TILE))
+        if pygame.display.get_surface() is not None:
+            chunk = chunk.convert()
+        live = []
+        for y in range(y0, y1):
+            row = self.grid[y]
+            for x in range(x0, x1):
+                kind = row[x]
+                px, py = (x-x0)*TILE, (y-y0)*TILE
+                self._draw_beveled(chunk, px, py, COLORS[kind])
+                if self._is_live(x, y, kind):
+                    # fase propia de la celda, en cuadros
+                    rad, wx, wy = ANIM_WAVES.get(kind, (0, 0, 0))
+                    ph = (x*TILE*wx + y*TILE*wy) * rad * ANIM_PHASES / (2*math.pi)
+                    live.append((x, y, kind, ph))
+                else:
+                    self._draw_static_detail(chunk, px, py, kind)
+        self.chunks[(cx, cy)] = entry = (chunk, live)
+        return entry
+
     def draw(self, surf, camx=0, camy=0, view_w=50, view_h=36, tick=0):
-        for vy in range(view_h):
-            y = camy + vy
-            if y < 0 or y >= self.h:
+        x0, y0 = max(0, camx), max(0, camy)
+        x1, y1 = min(self.w, camx + view_w), min(self.h, camy + view_h)
+        # los bloques se salen de la vista: recortar
+        old_clip = surf.get_clip()
+        surf.set_clip(old_clip.clip((0, 0, view_w*TILE, view_h*TILE)))
+        live = []
+        for cy in range(y0 // CHUNK, (y1 - 1) // CHUNK + 1):
+            for cx in range(x0 // CHUNK, (x1 - 1) // CHUNK + 1):
+                entry = self.chunks.get((cx, cy)) or self._render_chunk(cx, cy)
+                surf.blit(entry[0], ((cx*CHUNK - camx) * TILE, (cy*CHUNK - camy) * TILE))
+                live.extend(entry[1])
+        surf.set_clip(old_clip)
+
+        # encima: solo lo animado, en orden de filas como antes, en un solo blits
+        anim = ANIM or self._build_anim()
+        water, tree_dy, mine_dy, dots = anim[WATER], anim[FOREST], anim[MINE], anim["dots"]
+        # avance de la fase por el tick, en cuadros
+        k = ANIM_PHASES / (2*math.pi)
+        t_water, t_tree, t_mine = (tick * ANIM_WAVES[kind][0] * k for kind in (WATER, FOREST, MINE))
+        shift = (tick//6) % 3
+        if MINE_IMG:
+            mine_ox = TILE//2 - MINE_IMG.get_width()//2
+            mine_oy = TILE//2 - MINE_IMG.get_height()//2
+        if WALL_IMG:
+            wall_ox = TILE//2 - WALL_IMG.get_width()//2
+            wall_oy = TILE//2 - WALL_IMG.get_height()//2
+        amounts = self.resource_amount
+        seq = []
+        live.sort(key=lambda c: (c[1], c[0]))
+        for x, y, kind, ph in live:
+            if not (x0 <= x < x1 and y0 <= y < y1):
                 continue
-            for vx in range(view_w):
-                x = camx + vx
-                if x < 0 or x >= self.w:
-                    continue
-                kind = self.grid[y][x]
-                base = COLORS[kind]
-                px, py = vx * TILE, vy * TILE
-                self._draw_beveled(surf, px, py, base)
-                self._draw_detail(surf, px, py, kind, tick)
+            px, py = (x - camx) * TILE, (y - camy) * TILE
+            v = amounts.get((x, y))
+            if v:
+                seq.append((dots[(min(3, v), shift)], (px, py)))
+            if kind == WATER:
+                seq.append((water[int(ph + t_water) % ANIM_PHASES], (px, py)))
+            elif kind == FOREST and TREE_IMG:
+                seq.append((TREE_IMG, (px, py + tree_dy[int(ph + t_tree) % ANIM_PHASES])))
+            elif kind == MINE and MINE_IMG:
+                seq.append((MINE_IMG, (px + mine_ox, py + mine_oy + mine_dy[int(ph + t_mine) % ANIM_PHASES])))
+            elif kind == WALL_DEF and WALL_IMG:
+                seq.append((WALL_IMG, (px + wall_ox, py + wall_oy)))
+        surf.blits(seq, doreturn=False)
+
+        # edificios (indexados): solo los que asoman en la vista; el sprite
+        # sale hacia arriba y a los costados de su celda
+        def visible(cells, img):
+            mx = img.get_width() // (2*TILE) + 1
+            my = img.get_height() // TILE + 1
+            return sorted(((x, y) for (x, y) in cells
+                           if x0 - mx <= x < x1 + mx and y0 <= y < y1 + my), key=lambda c: (c[1], c[0]))
 
         if 'TOWER_IMG' in globals() and TOWER_IMG:
-            for (x, y) in self.positions_for(TOWER):
+            for (x, y) in visible(self.idx[TOWER], TOWER_IMG):
                 px = (x - camx) * TILE
                 py = (y - camy) * TILE
                 rect = TOWER_IMG.get_rect(midbottom=(px + TILE/2, py + TILE + 2))
                 surf.blit(TOWER_IMG, rect)
 
         if 'HOSPITAL_IMG' in globals() and HOSPITAL_IMG:
-            for (x, y) in self.positions_for(HOSPITAL):
+            for (x, y) in visible(self.idx[HOSPITAL], HOSPITAL_IMG):
                 px = (x - camx) * TILE
                 py = (y - camy) * TILE
                 rect = HOSPITAL_IMG.get_rect(midbottom=(px + TILE/2, py + TILE + 2))